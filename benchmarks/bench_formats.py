@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+Benchmarks the file formats and compressions of FileStorage.
+
+Reviews and places are turned into the dictionaries FileStorage writes,
+and each installed codec times writing them to a temporary file and
+reading them back, and reports the size of the file. The codecs whose
+packages are missing are skipped.
+
+USAGE: python3 -m benchmarks.bench_formats [number of objects ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from models.engine import formats
+from models.place import Place
+from models.review import Review
+
+REPEAT = 3
+
+
+def make_dicts(count):
+    """
+    Build the dictionaries of a storage holding places and reviews.
+
+    Args:
+        count (int): The number of objects, one place for nine reviews.
+
+    Returns:
+        dict: The dictionaries by key.
+    """
+    obj_dicts = {}
+    for i in range(count):
+        if i % 10 == 0:
+            obj = Place(city_id="c{:d}".format(i % 300),
+                        user_id="u{:d}".format(i % 5000),
+                        name="Place {:d}".format(i),
+                        description="A quiet place near the center",
+                        number_rooms=i % 5, number_bathrooms=1,
+                        max_guest=4, price_by_night=100 + i % 50,
+                        latitude=37.77 + i % 100 / 1000,
+                        longitude=-122.41 - i % 100 / 1000,
+                        amenity_ids=[])
+        else:
+            obj = Review(place_id="p{:d}".format(i % 10000),
+                         user_id="u{:d}".format(i % 5000),
+                         text="Great stay, would come back {:d}".format(i))
+        obj_dict = obj.to_dict()
+        obj_dicts["{}.{}".format(obj_dict["__class__"], obj.id)] = obj_dict
+    return obj_dicts
+
+
+def best_of(function):
+    """
+    Time a function.
+
+    Args:
+        function (callable): The function, called without arguments.
+
+    Returns:
+        float: The best time of REPEAT calls, in seconds.
+    """
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(counts):
+    """
+    Run the benchmark and print one table per number of objects.
+
+    Args:
+        counts (list): The numbers of objects.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "file.json")
+        for count in counts:
+            obj_dicts = make_dicts(count)
+            print("{:d} objects".format(count))
+            print("{:>8} {:>6} {:>9} {:>9} {:>10}".format(
+                "format", "comp", "save (s)", "load (s)", "size (MB)"))
+            for format_name in formats.FORMATS:
+                for compression in (None,) + formats.COMPRESSIONS:
+                    try:
+                        codec = formats.Codec(format_name, compression)
+                    except ImportError:
+                        continue
+
+                    def save():
+                        """Encode and write the file."""
+                        with open(path, 'wb') as f:
+                            f.write(codec.dumps(obj_dicts))
+
+                    save_time = best_of(save)
+                    load_time = best_of(lambda: formats.load(path))
+                    print("{:>8} {:>6} {:9.3f} {:9.3f} {:10.1f}".format(
+                        format_name, compression or "-", save_time,
+                        load_time, os.path.getsize(path) / 1e6))
+            print()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100000, 1000000])
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+"""
+Benchmarks finding the places within a radius of a point with the grid
+index FileStorage keeps, against scanning every place.
+
+The places are spread over Europe, with a third of them in Paris, and
+the query is repeated with growing radii around Paris.
+
+USAGE: python3 -m benchmarks.bench_places_near [number of places]
+"""
+import random
+import sys
+import time
+
+from models.engine.geo import coordinates, haversine
+from models.engine.indexes import GridIndex
+from models.place import Place
+
+RADII = (1, 10, 100)
+
+
+def make_places(count):
+    """
+    Build places with random coordinates, without storing them.
+
+    Args:
+        count (int): The number of places.
+
+    Returns:
+        list: The (key, place) pairs.
+    """
+    rng = random.Random(0)
+    items = []
+    for i in range(count):
+        if i % 3:
+            latitude = rng.uniform(36, 60)
+            longitude = rng.uniform(-10, 30)
+        else:
+            latitude = rng.gauss(48.8566, 0.1)
+            longitude = rng.gauss(2.3522, 0.1)
+        place_id = "{:08d}-0000-4000-8000-000000000000".format(i)
+        place = Place(id=place_id, latitude=latitude, longitude=longitude)
+        items.append(("Place." + place_id, place))
+    return items
+
+
+def scan(places, latitude, longitude, radius):
+    """
+    Find the places within a radius by computing every distance.
+
+    Args:
+        places (list): The places.
+        latitude (float): The latitude of the point, in degrees.
+        longitude (float): The longitude of the point, in degrees.
+        radius (float): The distance, in kilometers.
+
+    Returns:
+        list: The (distance, place) pairs within the radius, nearest
+        first.
+    """
+    found = []
+    for place in places:
+        distance = haversine(latitude, longitude, *coordinates(place))
+        if distance <= radius:
+            found.append((distance, place))
+    found.sort(key=lambda pair: pair[0])
+    return found
+
+
+def main(count):
+    """
+    Run the benchmark and print one line per radius.
+
+    Args:
+        count (int): The number of places.
+    """
+    items = make_places(count)
+    places = [place for key, place in items]
+    index = GridIndex(("Place",))
+    start = time.perf_counter()
+    index.add_many(items)
+    print("index {:d} places {:8.3f} s"
+          .format(count, time.perf_counter() - start))
+    for radius in RADII:
+        start = time.perf_counter()
+        found = index.near(Place, 48.8566, 2.3522, radius)
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = scan(places, 48.8566, 2.3522, radius)
+        elapsed = time.perf_counter() - start
+        assert [place for distance, place in found] == \
+            [place for distance, place in scanned]
+        print("{:4d} km: {:7d} places, grid {:8.4f} s, scan {:8.4f} s"
+              .format(radius, len(found), indexed, elapsed))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
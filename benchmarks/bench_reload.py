@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.reload() on a large file.json, parsing the
+created_at/updated_at fields with the legacy strptime() path and with
+the fromisoformat() path used by BaseModel.
+
+USAGE: python3 -m benchmarks.bench_reload [number of objects]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from models import base_model
+from models.base_model import TIME_FORMAT
+from models.engine.file_storage import FileStorage
+
+
+def legacy_parse_datetime(value):
+    """Parse a datetime the way BaseModel did before, with strptime."""
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+def write_file(path, count):
+    """
+    Write a file.json holding count State objects.
+
+    Args:
+        path (str): The path of the file to write.
+        count (int): The number of objects.
+    """
+    now = datetime.now().strftime(TIME_FORMAT)
+    objs = {}
+    for i in range(count):
+        obj_id = "{:08d}-0000-4000-8000-000000000000".format(i)
+        objs["State." + obj_id] = {"id": obj_id, "created_at": now,
+                                   "updated_at": now,
+                                   "name": "State {}".format(i),
+                                   "__class__": "State"}
+    with open(path, "w") as f:
+        json.dump(objs, f)
+
+
+def time_reload(storage):
+    """
+    Reload the storage from scratch.
+
+    Args:
+        storage (FileStorage): The storage to reload.
+
+    Returns:
+        float: The time taken, in seconds.
+    """
+    FileStorage._FileStorage__objects = {}
+    start = time.perf_counter()
+    storage.reload()
+    return time.perf_counter() - start
+
+
+def main(count):
+    """
+    Run the benchmark and print one line per parser.
+
+    Args:
+        count (int): The number of objects in the file.
+    """
+    saved_path = FileStorage._FileStorage__file_path
+    saved_objects = FileStorage._FileStorage__objects
+    fast_parse_datetime = base_model.parse_datetime
+    storage = FileStorage()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           "file.json")
+        write_file(FileStorage._FileStorage__file_path, count)
+        try:
+            for name, parser in (("strptime", legacy_parse_datetime),
+                                 ("fromisoformat", fast_parse_datetime)):
+                base_model.parse_datetime = parser
+                elapsed = time_reload(storage)
+                print("reload {:d} objects with {:<13s} {:8.3f} s"
+                      .format(count, name, elapsed))
+        finally:
+            base_model.parse_datetime = fast_parse_datetime
+            FileStorage._FileStorage__file_path = saved_path
+            FileStorage._FileStorage__objects = saved_objects
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
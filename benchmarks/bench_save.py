@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage.save() after changing a single object, against a
+save serializing every object, as every save did before dirty tracking.
+
+The storage is filled with reviews written to a temporary file, and each
+save is timed with growing numbers of untouched objects.
+
+USAGE: python3 -m benchmarks.bench_save [largest number of objects]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from models.engine.file_storage import FileStorage
+from models.review import Review
+
+REPEAT = 5
+
+
+def timed_save(storage, obj, full):
+    """
+    Change one object and time the save that follows.
+
+    Args:
+        storage (FileStorage): The storage.
+        obj (Review): The object to change.
+        full (bool): Whether to forget the serialized objects first, so
+        that every object is serialized again.
+
+    Returns:
+        float: The best time of REPEAT saves, in seconds.
+    """
+    best = float('inf')
+    for i in range(REPEAT):
+        obj.text = "Changed {:d}".format(i)
+        if full:
+            FileStorage._FileStorage__fragments.clear()
+        start = time.perf_counter()
+        storage.save()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(largest):
+    """
+    Run the benchmark and print one line per number of objects.
+
+    Args:
+        largest (int): The largest number of objects.
+    """
+    storage = FileStorage()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           "file.json")
+        count = 1000
+        while count <= largest:
+            FileStorage._FileStorage__objects = {}
+            reviews = [Review(place_id="p{:d}".format(i % 100),
+                              user_id="u{:d}".format(i % 50),
+                              text="Review number {:d}".format(i))
+                       for i in range(count)]
+            storage.new_many(reviews)
+            storage.save()
+            full = timed_save(storage, reviews[0], True)
+            dirty = timed_save(storage, reviews[0], False)
+            print("{:8d} objects: every object {:8.4f} s, "
+                  "one dirty object {:8.4f} s"
+                  .format(count, full, dirty))
+            count *= 10
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
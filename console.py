@@ -4,11 +4,14 @@ Provides a command-line interface for interacting with
 storage and data models.
 """
 import cmd
+import json
 import re
+import time
 
 import models
 from models import storage
 from models.engine.file_storage import get_class_name_to_class
+from models.engine.transfer import export_objects, import_objects
 
 import shlex  # for splitting the line along spaces except in double quotes
 from shlex import split
@@ -80,7 +83,31 @@ class HBNBCommand(cmd.Cmd):
 
         new_instance = get_class_name_to_class()[class_name]()
 
-        for param in args[1:]:
+        for key, value in self.parse_params(args[1:]):
+            setattr(new_instance, key, value)
+        storage.new(new_instance)
+        new_instance.save()
+        print(new_instance.id)
+
+    @staticmethod
+    def parse_params(params):
+        """
+        Parse the <key>=<value> parameters of the create command.
+
+        Args:
+            params (list): The parameters.
+
+        Returns:
+            list: The (key, value) pairs, with values converted to str,
+            float or int; invalid floats are reported and skipped.
+
+        Raises:
+            ValueError: If a parameter has no "=".
+        """
+        pairs = []
+        for param in params:
+            if "=" not in param:
+                raise ValueError(f"{param} is not a <key>=<value> parameter")
             key, value = param.split("=", 1)
             if key == 'email':
                 value = value.strip('"')
@@ -97,11 +124,113 @@ class HBNBCommand(cmd.Cmd):
                     value = int(value)
                 except ValueError:
                     value = value.replace('_', ' ')
+            pairs.append((key, value))
+        return pairs
 
-            setattr(new_instance, key, value)
-        storage.new(new_instance)
-        new_instance.save()
-        print(new_instance.id)
+    def do_bulk_create(self, arg):
+        """
+        Create many instances of a class, saved with a single write.
+        Each line holds the parameters of one instance, either as for
+        create or as a JSON object; lines are read from the file, or
+        from the standard input up to an empty line.
+        USAGE: bulk_create <class name> [<file>]
+        """
+        args = shlex.split(arg)
+        if not args:
+            print("** class name missing **")
+            return
+        if args[0] not in self.defined_classes:
+            print("** class doesn't exist **")
+            return
+        cls = get_class_name_to_class()[args[0]]
+        if len(args) > 1:
+            try:
+                with open(args[1], 'r') as f:
+                    lines = f.read().splitlines()
+            except OSError as error:
+                print(f"** cannot read {args[1]}: {error.strerror} **")
+                return
+        else:
+            lines = iter(self.stdin.readline, '')
+        start = time.perf_counter()
+        new_instances = []
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                if len(args) > 1:
+                    continue
+                break
+            try:
+                if line.startswith('{'):
+                    pairs = json.loads(line).items()
+                else:
+                    pairs = self.parse_params(shlex.split(line))
+            except ValueError as error:
+                print(f"Error: line {number}: {error}. Skipping...")
+                continue
+            new_instance = cls()
+            for key, value in pairs:
+                if key not in ('id', 'created_at', 'updated_at',
+                               '__class__'):
+                    setattr(new_instance, key, value)
+            new_instances.append(new_instance)
+        storage.new_many(new_instances)
+        storage.save()
+        elapsed = time.perf_counter() - start
+        print("{:d} {} created in {:.3f} s ({:.0f} objects/s)"
+              .format(len(new_instances), args[0], elapsed,
+                      len(new_instances) / elapsed if elapsed else 0))
+
+    def do_export(self, arg):
+        """
+        Write the stored objects, or those of a class, to a file with
+        one JSON object per line, streaming them from the storage.
+        USAGE: export <file> [<class name>]
+        """
+        args = shlex.split(arg)
+        if not args:
+            print("** file name missing **")
+            return
+        if len(args) > 1 and args[1] not in self.defined_classes:
+            print("** class doesn't exist **")
+            return
+        start = time.perf_counter()
+        try:
+            with open(args[0], 'w') as f:
+                count = export_objects(storage, f,
+                                       args[1] if len(args) > 1 else None)
+        except OSError as error:
+            print(f"** cannot write {args[0]}: {error.strerror} **")
+            return
+        elapsed = time.perf_counter() - start
+        print("{:d} objects exported in {:.3f} s ({:.0f} objects/s)"
+              .format(count, elapsed, count / elapsed if elapsed else 0))
+
+    def do_import(self, arg):
+        """
+        Store the objects of a file written by export, keeping their ids,
+        reading it line by line. Nothing is stored if a line is invalid.
+        USAGE: import <file>
+        """
+        args = shlex.split(arg)
+        if not args:
+            print("** file name missing **")
+            return
+        start = time.perf_counter()
+        try:
+            with open(args[0], 'r') as f:
+                count, skipped = import_objects(storage, f)
+        except OSError as error:
+            print(f"** cannot read {args[0]}: {error.strerror} **")
+            return
+        except Exception as error:
+            print(f"** import failed: {error} **")
+            return
+        elapsed = time.perf_counter() - start
+        print("{:d} objects imported in {:.3f} s ({:.0f} objects/s)"
+              .format(count, elapsed, count / elapsed if elapsed else 0))
+        if skipped:
+            print(f"{skipped:d} objects skipped")
 
     def do_show(self, line):
         """
@@ -109,17 +238,16 @@ class HBNBCommand(cmd.Cmd):
         USAGE: show <class name> <id>
         """
         args = parse_command(line)
-        objects_dict = storage.all()
         if len(line) == 0:
             print("** class name missing **")
         elif args[0] not in HBNBCommand.defined_classes:
             print("** class doesn't exist **")
         elif len(args) == 1:
             print("** instance id missing **")
-        elif f'{args[0]}.{args[1]}' not in objects_dict:
+        elif storage.get(args[0], args[1]) is None:
             print("** no instance found **")
         else:
-            print(objects_dict[f'{args[0]}.{args[1]}'])
+            print(storage.get(args[0], args[1]))
 
     def do_destroy(self, line):
         """
@@ -127,17 +255,16 @@ class HBNBCommand(cmd.Cmd):
         USAGE: show <class name> <id>
         """
         args = parse_command(line)
-        objects_dict = storage.all()
         if len(line) == 0:
             print("** class name missing **")
         elif args[0] not in HBNBCommand.defined_classes:
             print("** class doesn't exist **")
         elif len(args) == 1:
             print("** instance id missing **")
-        elif f'{args[0]}.{args[1]}' not in objects_dict:
+        elif storage.get(args[0], args[1]) is None:
             print("** no instance found **")
         else:
-            del objects_dict[f'{args[0]}.{args[1]}']
+            storage.delete(storage.get(args[0], args[1]))
             storage.save()
 
     def do_all(self, arg):
@@ -157,13 +284,27 @@ class HBNBCommand(cmd.Cmd):
         print(", ".join(obj_list), end="")
         print("]")
 
+    def do_search(self, line):
+        """
+        Print the instances of a class whose text contains every word.
+        USAGE: search <class name> <words>
+        """
+        args = parse_command(line)
+        if len(args) == 0:
+            print("** class name missing **")
+            return
+        if args[0] not in HBNBCommand.defined_classes:
+            print("** class doesn't exist **")
+            return
+        found = storage.search(args[0], " ".join(args[1:]))
+        print("[" + ", ".join(str(obj) for obj in found) + "]")
+
     def do_update(self, line):
         """
         Update the attributes of a specified instance.
         USAGE: update <class name> <id> <attribute name> "<attribute value>"
         """
         args = parse_command(line)
-        objects_dict = storage.all()
 
         if len(args) == 0:
             print("** class name missing **")
@@ -174,7 +315,8 @@ class HBNBCommand(cmd.Cmd):
         if len(args) == 1:
             print("** instance id missing **")
             return
-        if f'{args[0]}.{args[1]}' not in objects_dict:
+        updated_obj = storage.get(args[0], args[1])
+        if updated_obj is None:
             print("** no instance found **")
             return
         if len(args) == 2:
@@ -187,27 +329,26 @@ class HBNBCommand(cmd.Cmd):
                 print("** value missing **")
                 return
         if len(args) == 4:
-            updated_obj = objects_dict[f'{args[0]}.{args[1]}']
             # If the updated argument is new
             if args[2] in updated_obj.__class__.__dict__.keys():
                 value_type = type(updated_obj.__class__.__dict__[args[2]])
-                updated_obj.__dict__[args[2]] = value_type(args[3])
+                setattr(updated_obj, args[2], value_type(args[3]))
             else:
-                updated_obj.__dict__[args[2]] = args[3]
+                setattr(updated_obj, args[2], args[3])
 
+            storage.new(updated_obj)
             storage.save()
         elif type(eval(args[2])) == dict:
-            updated_obj = objects_dict[f'{args[0]}.{args[1]}']
-
             for key, val in eval(args[2]).items():
                 if (key in updated_obj.__class__.__dict__.keys() and
                     type(updated_obj.__class__.__dict__[key] in
                          [str, int, float])):
                     value_type = type(updated_obj.__class__.__dict__[key])
-                    updated_obj.__dict__[key] = value_type(val)
+                    setattr(updated_obj, key, value_type(val))
                 else:
-                    updated_obj.__dict__[key] = val
+                    setattr(updated_obj, key, val)
 
+            storage.new(updated_obj)
             storage.save()
 
     def do_count(self, line):
@@ -216,13 +357,7 @@ class HBNBCommand(cmd.Cmd):
         USAGE: count <class name>
         """
         args = parse_command(line)
-        objects_dict = storage.all()
-        count = 0
-
-        for obj in objects_dict.values():
-            if args[0] == obj.__class__.__name__:
-                count += 1
-        print(count)
+        print(storage.aggregate(args[0], "count"))
 
     def default(self, line):
         """Handle unknown commands based on defined patterns.
@@ -233,7 +368,8 @@ class HBNBCommand(cmd.Cmd):
             "show": self.do_show,
             "destroy": self.do_destroy,
             "update": self.do_update,
-            "count": self.do_count
+            "count": self.do_count,
+            "search": self.do_search
         }
 
         split_command = re.search(r'(\w+).?(.+)', line)
@@ -10,10 +10,15 @@ class Amenity(BaseModel, Base):
     """Represents an amenity entity."""
     if models.storage_type == 'db':
         __tablename__ = 'amenities'
-        name = Column(String(128), nullable=False)
+        name = Column(String(128), nullable=False, index=True)
     else:
         name = ''
 
+        @property
+        def place_amenities(self):
+            """getter for list of place instances linked to the amenity"""
+            return models.storage.related("Place", "amenity_ids", self.id)
+
     def __init__(self, *args, **kwargs):
         """initializes Amenity"""
         super().__init__(*args, **kwargs)
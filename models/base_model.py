@@ -13,6 +13,40 @@ if models.storage_type == "db":
 else:
     Base = object
 
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def format_datetime(value):
+    """
+    Serialize a datetime in the storage format, TIME_FORMAT.
+
+    isoformat() produces the same string as strftime(TIME_FORMAT)
+    several times faster.
+
+    Args:
+        value (datetime): The datetime to serialize.
+
+    Returns:
+        str: The serialized datetime.
+    """
+    return value.isoformat(timespec="microseconds")
+
+
+def parse_datetime(value):
+    """
+    Parse a datetime serialized in the storage format, TIME_FORMAT.
+
+    fromisoformat() is implemented in C and is an order of magnitude
+    faster than strptime(), which dominated reloading large files.
+
+    Args:
+        value (str): The serialized datetime.
+
+    Returns:
+        datetime: The parsed datetime.
+    """
+    return datetime.fromisoformat(value)
+
 
 class BaseModel:
     """Base class for data models."""
@@ -37,13 +71,17 @@ class BaseModel:
             # we should only delete it if it's actually present in the kwargs.
             # so we use the pop method instead of the del method.
             kwargs.pop('__class__', None)
+            # In file mode the object is not stored yet, so the storage
+            # has nothing to re-index: bypass the __setattr__ hook.
+            if models.storage_type == "db":
+                set_attribute = setattr
+            else:
+                set_attribute = object.__setattr__
             for key, value in kwargs.items():
                 if key in ['created_at', 'updated_at']:
-                    setattr(self,
-                            key,
-                            datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f"))
+                    set_attribute(self, key, parse_datetime(value))
                 else:
-                    setattr(self, key, value)
+                    set_attribute(self, key, value)
             if kwargs.get("id", None) is None:
                 self.id = str(uuid.uuid4())
         else:
@@ -51,6 +89,19 @@ class BaseModel:
             self.created_at = datetime.now()
             self.updated_at = datetime.now()
 
+    if models.storage_type != "db":
+        def __setattr__(self, name, value):
+            """
+            Set an attribute and let the storage update its indexes.
+
+            Args:
+                name (str): The name of the attribute.
+                value: The new value of the attribute.
+            """
+            old = self.__dict__.get(name)
+            super().__setattr__(name, value)
+            models.storage.changed(self, name, old)
+
     def __str__(self):
         """
         Return a string representation of the object.
@@ -72,11 +123,9 @@ class BaseModel:
         """returns a dictionary containing all keys/values of the instance"""
         new_dict = self.__dict__.copy()
         if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"]\
-                .strftime("%Y-%m-%dT%H:%M:%S.%f")
+            new_dict["created_at"] = format_datetime(new_dict["created_at"])
         if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"]\
-                .strftime("%Y-%m-%dT%H:%M:%S.%f")
+            new_dict["updated_at"] = format_datetime(new_dict["updated_at"])
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
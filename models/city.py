@@ -13,12 +13,17 @@ class City(BaseModel, Base):
     if models.storage_type == "db":
         __tablename__ = 'cities'
         state_id = Column(String(60), ForeignKey('states.id'), nullable=False)
-        name = Column(String(128), nullable=False)
+        name = Column(String(128), nullable=False, index=True)
         places = relationship("Place", backref="cities")
     else:
         state_id = ""
         name = ""
 
+        @property
+        def places(self):
+            """getter for list of place instances located in the city"""
+            return models.storage.related("Place", "city_id", self.id)
+
     def __init__(self, *args, **kwargs):
         """initializes city"""
         super().__init__(*args, **kwargs)
@@ -0,0 +1,368 @@
+#!/usr/bin/python3
+"""Provides the column-oriented mirror of the stored objects that
+FileStorage.aggregate() computes on.
+
+Numeric attributes are kept in typed arrays, one per attribute, with NaN
+standing for a missing value. Foreign keys are dictionary-encoded: each
+distinct id gets a small integer code, and the column holds the codes.
+When NumPy is installed, filters and aggregates run vectorized over the
+arrays; otherwise they are computed by plain loops over the same arrays.
+"""
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+NUMERIC = {'Place': ('number_rooms', 'number_bathrooms', 'max_guest',
+                     'price_by_night', 'latitude', 'longitude')}
+INTEGERS = {'number_rooms', 'number_bathrooms', 'max_guest',
+            'price_by_night'}
+CODED = {'City': ('state_id',), 'Place': ('city_id', 'user_id'),
+         'Review': ('place_id', 'user_id')}
+FUNCTIONS = ('count', 'sum', 'min', 'max', 'avg')
+
+
+def view(column):
+    """
+    View a column as a NumPy array without copying it.
+
+    Args:
+        column (array): The column.
+
+    Returns:
+        numpy.ndarray: The array sharing the memory of the column.
+    """
+    if not len(column):
+        return numpy.zeros(0, dtype=column.typecode)
+    return numpy.frombuffer(column, dtype=column.typecode)
+
+
+def number(value):
+    """
+    Convert an attribute value to a float for a numeric column.
+
+    Args:
+        value: The attribute value.
+
+    Returns:
+        float: The value, or NaN if it is missing or not a number.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return math.nan
+
+
+class Table:
+    """Holds the columns of the objects of one class, one row per
+    object. Removing an object moves the last row into its place."""
+
+    def __init__(self, class_name):
+        """
+        Initialize an empty table.
+
+        Args:
+            class_name (str): The name of the class of the objects, which
+            selects the attributes kept in columns.
+        """
+        self.keys = []
+        self.rows = {}
+        self.numeric = {name: array('d')
+                        for name in NUMERIC.get(class_name, ())}
+        self.coded = {name: array('q') for name in CODED.get(class_name, ())}
+        self.codes = {name: {} for name in self.coded}
+        self.values = {name: [] for name in self.coded}
+
+    def __len__(self):
+        """Return the number of rows."""
+        return len(self.keys)
+
+    def encode(self, name, value):
+        """
+        Return the code of a foreign key value, assigning a new one to a
+        value not seen before.
+
+        Args:
+            name (str): The name of the foreign key attribute.
+            value: The attribute value.
+
+        Returns:
+            int: The code, or -1 if the value is empty or not an id.
+        """
+        if not isinstance(value, str) or not value:
+            return -1
+        codes = self.codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[name])
+            self.values[name].append(value)
+        return code
+
+    def put(self, key, obj):
+        """
+        Store the attributes of an object in its row, adding the row if
+        the object is new.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object.
+        """
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.keys)
+            self.keys.append(key)
+            for column in self.numeric.values():
+                column.append(math.nan)
+            for column in self.coded.values():
+                column.append(-1)
+        for name, column in self.numeric.items():
+            column[row] = number(getattr(obj, name, None))
+        for name, column in self.coded.items():
+            column[row] = self.encode(name, getattr(obj, name, None))
+
+    def remove(self, key):
+        """
+        Remove the row of an object if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = self.keys.pop()
+        columns = list(self.numeric.values()) + list(self.coded.values())
+        for column in columns:
+            value = column.pop()
+            if row < len(self.keys):
+                column[row] = value
+        if row < len(self.keys):
+            self.keys[row] = last
+            self.rows[last] = row
+
+    def decode(self, name, code):
+        """
+        Return the foreign key value of a code.
+
+        Args:
+            name (str): The name of the foreign key attribute.
+            code (int): The code.
+
+        Returns:
+            The id, or None for the code of a missing value.
+        """
+        return None if code < 0 else self.values[name][code]
+
+    def select(self, filters):
+        """
+        Find the rows matching filters.
+
+        Args:
+            filters (dict): Column values the rows must be equal to. The
+            value for a numeric column can also be a (low, high) tuple of
+            inclusive bounds, either of which may be None.
+
+        Returns:
+            The matching row numbers, as a NumPy array when NumPy is
+            installed and as a list otherwise.
+
+        Raises:
+            ValueError: If a filter is not on a column of the table.
+        """
+        tests = []
+        for name, value in filters.items():
+            if name in self.coded:
+                code = self.codes[name].get(value, -2)
+                tests.append((self.coded[name], code, code))
+            elif name not in self.numeric:
+                raise ValueError("{} is not a numeric or foreign key column"
+                                 .format(name))
+            elif isinstance(value, tuple):
+                tests.append((self.numeric[name],) + value)
+            else:
+                tests.append((self.numeric[name], value, value))
+        if numpy is not None:
+            mask = numpy.ones(len(self), dtype=bool)
+            for column, low, high in tests:
+                column = view(column)
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            return numpy.flatnonzero(mask)
+        return [row for row in range(len(self))
+                if all((low is None or column[row] >= low) and
+                       (high is None or column[row] <= high)
+                       for column, low, high in tests)]
+
+    def aggregate(self, func='count', attribute=None, filters=None,
+                  group_by=None):
+        """
+        Compute an aggregate over the rows matching filters, as
+        FileStorage.aggregate() documents.
+
+        Args:
+            func (str): One of count, sum, min, max and avg.
+            attribute (Optional[str]): The numeric column to aggregate;
+            count without one counts the rows.
+            filters (Optional[dict]): As for select().
+            group_by (Optional[str]): A foreign key column to group by.
+
+        Returns:
+            The aggregate, or a dictionary of aggregates by foreign key
+            value when group_by is given.
+
+        Raises:
+            ValueError: If func is unknown, or if attribute, group_by or a
+            filter is not a column of the right kind.
+        """
+        if func not in FUNCTIONS:
+            raise ValueError("unknown aggregate function: {}".format(func))
+        if func != 'count' and attribute is None:
+            raise ValueError("{} needs an attribute".format(func))
+        if attribute is not None and attribute not in self.numeric:
+            raise ValueError("{} is not a numeric column".format(attribute))
+        if group_by is not None and group_by not in self.coded:
+            raise ValueError("{} is not a foreign key column"
+                             .format(group_by))
+        rows = self.select(filters or {})
+        column = self.numeric[attribute] if attribute is not None else None
+        codes = self.coded[group_by] if group_by is not None else None
+
+        def finish(values):
+            """Reduce the values of a group and give the result the type
+            of the column."""
+            result = reduce_values(func, values)
+            if result is not None and func in ('sum', 'min', 'max') and \
+                    attribute in INTEGERS:
+                result = int(result)
+            return result
+
+        if numpy is not None:
+            if column is None:
+                values = numpy.zeros(len(rows))
+            else:
+                values = view(column)[rows]
+            if codes is None:
+                return finish(values[~numpy.isnan(values)])
+            codes = view(codes)[rows]
+            order = numpy.argsort(codes, kind='stable')
+            groups, starts = numpy.unique(codes[order], return_index=True)
+            parts = numpy.split(values[order], starts[1:])
+            return {self.decode(group_by, int(group)):
+                    finish(part[~numpy.isnan(part)])
+                    for group, part in zip(groups, parts)}
+
+        groups = {}
+        for row in rows:
+            value = 0.0 if column is None else column[row]
+            values = groups.setdefault(-1 if codes is None else codes[row],
+                                       [])
+            if not math.isnan(value):
+                values.append(value)
+        if codes is None:
+            return finish(groups.get(-1, []))
+        return {self.decode(group_by, code): finish(values)
+                for code, values in groups.items()}
+
+
+def reduce_values(func, values):
+    """
+    Reduce the present values of a column.
+
+    Args:
+        func (str): One of count, sum, min, max and avg.
+        values: The values, as a NumPy array when NumPy is installed and
+        as a list otherwise.
+
+    Returns:
+        The count, or the aggregate as a float, or None if there are no
+        values to aggregate.
+    """
+    if func == 'count':
+        return len(values)
+    if not len(values):
+        return None
+    if numpy is not None:
+        return float(getattr(values, 'mean' if func == 'avg' else func)())
+    if func == 'avg':
+        return math.fsum(values) / len(values)
+    return float({'sum': math.fsum, 'min': min, 'max': max}[func](values))
+
+
+class ColumnIndex:
+    """Keeps a Table of columns for each class of stored objects."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.tables = {}
+        self.attributes = set().union(*NUMERIC.values(), *CODED.values())
+
+    def table(self, cls):
+        """
+        Return the table of a class.
+
+        Args:
+            cls (Type): The exact class of the objects.
+
+        Returns:
+            Table: The table, empty if no object of cls is indexed.
+        """
+        table = self.tables.get(cls)
+        if table is None:
+            table = Table(getattr(cls, '__name__', ''))
+        return table
+
+    def add(self, key, obj):
+        """
+        Index an object.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        table = self.tables.get(type(obj))
+        if table is None:
+            table = self.tables[type(obj)] = Table(type(obj).__name__)
+        table.put(key, obj)
+
+    def add_many(self, items):
+        """
+        Index many objects.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        for key, obj in items:
+            self.add(key, obj)
+
+    def discard(self, key, obj, value=None):
+        """
+        Remove an object from the index if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+            value: Unused, as the row of the object is found by key.
+        """
+        table = self.tables.get(type(obj))
+        if table is not None:
+            table.remove(key)
+
+    def move(self, key, obj, old):
+        """
+        Update the row of an object one of whose attributes has changed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The changed object.
+            old: The previous value of the attribute.
+        """
+        self.add(key, obj)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.tables.clear()
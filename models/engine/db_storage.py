@@ -1,13 +1,28 @@
 #!/usr/bin/python3
 """Provides a simple storage system for managing and persisting
 objects in a database."""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
 from os import getenv
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import (Column, Integer, Table, create_engine, event,
+                        func as sql, inspect, or_, select)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import (configure_mappers, scoped_session, selectinload,
+                            sessionmaker)
 
-from models.base_model import BaseModel, Base
+import models
+from models.base_model import BaseModel, Base, parse_datetime
+from models.engine.columns import FUNCTIONS
 from models.engine.file_storage import get_class_name_to_class
+from models.engine.geo import bounding_box, haversine
+from models.engine.indexes import TEXT_ATTRIBUTES, tokenize
+
+if models.storage_type == 'db':
+    generations = Table('generations', Base.metadata,
+                        Column('id', Integer, primary_key=True),
+                        Column('value', Integer, nullable=False))
 
 
 class DBStorage:
@@ -15,6 +30,7 @@ class DBStorage:
 
     __engine = None
     __session = None
+    __batches = threading.local()
 
     def __init__(self):
         """Initialize a new DBStorage instance."""
@@ -27,18 +43,378 @@ class DBStorage:
         if getenv('HBNB_ENV') == 'test':
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
-        needed_classes = get_class_name_to_class()
+    def all(self, cls=None, eager=None):
+        """
+        query on the current database session
+
+        Args:
+            cls (Optional[Union[Type, str]]): A class, or the name of a
+            class, to filter the objects by.
+            eager (Optional[list]): Names of relationships to load along
+            with the objects, such as "cities" or "cities.places" for a
+            nested one. Each relationship costs one extra SELECT for all
+            rows instead of one per row on first access.
+
+        Returns:
+            dict: The matching objects by key.
+        """
         new_dict = {}
-        for clss in needed_classes:
-            if cls is None or cls is needed_classes[clss] or cls is clss:
-                objs = self.__session.query(needed_classes[clss]).all()
-                for obj in objs:
-                    key = obj.__class__.__name__ + '.' + obj.id
-                    new_dict[key] = obj
+        for clss in self.__mapped_classes(cls):
+            query = self.__session.query(clss)
+            if eager:
+                query = query.options(*self.__eager_options(clss, eager))
+            for obj in query.all():
+                new_dict[f'{clss.__name__}.{obj.id}'] = obj
         return (new_dict)
 
+    def get(self, cls, id):
+        """
+        Retrieve one object by class and id.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the object.
+            id (str): The id of the object.
+
+        Returns:
+            The object, or None if it is not stored.
+        """
+        mapped = self.__mapped_classes(cls)
+        if not mapped:
+            return None
+        return self.__session.query(mapped[0]).get(id)
+
+    def query(self, cls, filters=None, order_by=None, limit=None, offset=0,
+              eager=None):
+        """
+        Retrieve one page of the objects of a class matching filters,
+        with the filtering, ordering and paging done in SQL.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects to retrieve.
+            filters (Optional[dict]): Column values the objects must be
+            equal to.
+            order_by (Optional[str]): The column to sort by, prefixed
+            with "-" for descending order.
+            limit (Optional[int]): The maximum number of objects returned.
+            offset (int): The number of matching objects to skip.
+            eager (Optional[list]): Relationships to load along with the
+            objects, as for all().
+
+        Returns:
+            list: The matching objects, in order.
+        """
+        mapped = self.__mapped_classes(cls)
+        if not mapped:
+            return []
+        clss = mapped[0]
+        query = self.__session.query(clss)
+        if filters:
+            query = query.filter_by(**filters)
+        if order_by is not None:
+            column = getattr(clss, order_by.lstrip('-'))
+            if order_by.startswith('-'):
+                column = column.desc()
+            query = query.order_by(column)
+        if eager:
+            query = query.options(*self.__eager_options(clss, eager))
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def search(self, cls, text, limit=None):
+        """
+        Retrieve the objects of a class whose text contains every word of
+        a query, ignoring case: places by description and reviews by text.
+
+        On MySQL the rows are selected with MATCH ... AGAINST on the
+        FULLTEXT index of the column; elsewhere with LIKE. The words are
+        then checked exactly, as MySQL skips stopwords and short words.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects to retrieve.
+            text (str): The words to search for.
+            limit (Optional[int]): The maximum number of objects returned.
+
+        Returns:
+            list: The matching objects, in no particular order; none for
+            a class without a text attribute.
+        """
+        mapped = self.__mapped_classes(cls)
+        words = tokenize(text)
+        if not mapped or not words or \
+                mapped[0].__name__ not in TEXT_ATTRIBUTES:
+            return []
+        clss = mapped[0]
+        attribute = TEXT_ATTRIBUTES[clss.__name__]
+        column = getattr(clss, attribute)
+        query = self.__session.query(clss)
+        if self.__engine.dialect.name == 'mysql':
+            query = query.filter(column.match(
+                ' '.join('+' + word for word in sorted(words))))
+        else:
+            query = query.filter(*[column.like('%' + word + '%')
+                                   for word in words])
+        found = [obj for obj in query
+                 if words <= tokenize(getattr(obj, attribute))]
+        return found[:limit]
+
+    def search_places(self, amenity_ids=None, state_ids=None, city_ids=None,
+                      match_all=True, limit=None, offset=0, eager=None):
+        """
+        Retrieve the places having some amenities, in some locations, in
+        one query: the amenities are matched on the place_amenity table,
+        grouping its rows by place when every amenity is required.
+
+        Args:
+            amenity_ids (Optional[Iterable[str]]): The ids of the
+            amenities the places must have.
+            state_ids (Optional[Iterable[str]]): The ids of states; places
+            in any city of them are selected.
+            city_ids (Optional[Iterable[str]]): The ids of cities; places
+            in any of them are selected, in addition to those of states.
+            match_all (bool): Require every amenity rather than any one.
+            limit (Optional[int]): The maximum number of places returned.
+            offset (int): The number of matching places to skip.
+            eager (Optional[list]): Relationships to load along with the
+            places, as for all().
+
+        Returns:
+            list: The matching places, ordered by name.
+        """
+        place, city = self.__mapped_classes('Place')[0], \
+            self.__mapped_classes('City')[0]
+        query = self.__session.query(place)
+        amenity_ids = set(amenity_ids or ())
+        if amenity_ids:
+            links = inspect(place).relationships['amenities'].secondary
+            linked = self.__session.query(links.c.place_id)\
+                .filter(links.c.amenity_id.in_(amenity_ids))
+            if match_all:
+                linked = linked.group_by(links.c.place_id).having(
+                    sql.count(links.c.amenity_id) == len(amenity_ids))
+            query = query.filter(place.id.in_(linked))
+        elif not match_all:
+            return []
+        if state_ids or city_ids:
+            located = []
+            if city_ids:
+                located.append(place.city_id.in_(list(city_ids)))
+            if state_ids:
+                located.append(place.city_id.in_(
+                    self.__session.query(city.id)
+                    .filter(city.state_id.in_(list(state_ids)))))
+            query = query.filter(or_(*located))
+        query = query.order_by(place.name)
+        if eager:
+            query = query.options(*self.__eager_options(place, eager))
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def places_near(self, latitude, longitude, radius, limit=None,
+                    eager=None):
+        """
+        Retrieve the places within a distance of a point.
+
+        The places inside the bounding box of the circle are selected in
+        SQL, using the index on latitude, and the exact great-circle
+        distance is then checked for those only.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            radius (float): The distance, in kilometers.
+            limit (Optional[int]): The maximum number of places returned.
+            eager (Optional[list]): Relationships to load along with the
+            places, as for all().
+
+        Returns:
+            list: The places, nearest first.
+        """
+        clss = self.__mapped_classes('Place')[0]
+        min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude,
+                                                    radius)
+        query = self.__session.query(clss).filter(
+            clss.latitude.between(min_lat, max_lat),
+            or_(*[clss.longitude.between(low, high)
+                  for low, high in lon_ranges]))
+        if eager:
+            query = query.options(*self.__eager_options(clss, eager))
+        found = []
+        for place in query:
+            distance = haversine(latitude, longitude,
+                                 place.latitude, place.longitude)
+            if distance <= radius:
+                found.append((distance, place))
+        found.sort(key=lambda pair: pair[0])
+        return [place for distance, place in found[:limit]]
+
+    def aggregate(self, cls, func='count', attribute=None, filters=None,
+                  group_by=None):
+        """
+        Compute an aggregate over the rows of a table in SQL, mirroring
+        FileStorage.aggregate().
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects.
+            func (str): One of count, sum, min, max and avg.
+            attribute (Optional[str]): The column to aggregate; count
+            without one counts the rows.
+            filters (Optional[dict]): Column values the rows must be equal
+            to, or (low, high) tuples of inclusive bounds, either of which
+            may be None.
+            group_by (Optional[str]): A column to compute one aggregate
+            per value of.
+
+        Returns:
+            The aggregate, None if there was nothing to aggregate, or a
+            dictionary of aggregates by value when group_by is given.
+        """
+        if func not in FUNCTIONS:
+            raise ValueError("unknown aggregate function: {}".format(func))
+        if func != 'count' and attribute is None:
+            raise ValueError("{} needs an attribute".format(func))
+        mapped = self.__mapped_classes(cls)
+        if not mapped:
+            if group_by is not None:
+                return {}
+            return 0 if func == 'count' else None
+        clss = mapped[0]
+        if attribute is None:
+            expression = sql.count()
+        else:
+            expression = getattr(sql, func)(getattr(clss, attribute))
+        columns = [expression]
+        if group_by is not None:
+            columns.insert(0, getattr(clss, group_by))
+        query = self.__session.query(*columns).select_from(clss)
+        for name, value in (filters or {}).items():
+            column = getattr(clss, name)
+            low, high = value if isinstance(value, tuple) else (value, value)
+            if low == high:
+                query = query.filter(column == low)
+                continue
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+
+        def finish(result):
+            """Convert the DECIMAL results of MySQL to Python numbers."""
+            if isinstance(result, Decimal):
+                return float(result) if func == 'avg' else int(result)
+            return result
+
+        if group_by is not None:
+            query = query.group_by(getattr(clss, group_by))
+            return {group: finish(result) for group, result in query.all()}
+        return finish(query.scalar())
+
+    def stream(self, cls=None, batch_size=1000, eager=None):
+        """
+        Iterate over the stored objects without loading them all at once.
+
+        Rows are fetched through a server-side cursor, batch_size at a
+        time, so memory use does not grow with the size of the table.
+
+        Args:
+            cls (Optional[Union[Type, str]]): A class, or the name of a
+            class, to filter the objects by.
+            batch_size (int): The number of rows fetched per round trip.
+            eager (Optional[list]): Relationship paths to load with one
+            extra query per batch, as for all().
+
+        Yields:
+            BaseModel: The matching objects, one table after another.
+        """
+        for clss in self.__mapped_classes(cls):
+            query = self.__session.query(clss)\
+                .execution_options(stream_results=True)\
+                .yield_per(batch_size)
+            if eager:
+                query = query.options(*self.__eager_options(clss, eager))
+            for obj in query:
+                yield obj
+
+    def __mapped_classes(self, cls=None):
+        """
+        List the classes backed by a table, such as all but BaseModel.
+
+        Args:
+            cls (Optional[Union[Type, str]]): A class, or the name of a
+            class, to restrict the list to.
+
+        Returns:
+            list: The matching mapped classes.
+        """
+        mapped = []
+        for name, clss in get_class_name_to_class().items():
+            if cls is None or cls is clss or cls == name:
+                if inspect(clss, raiseerr=False) is not None:
+                    mapped.append(clss)
+        return mapped
+
+    def __eager_options(self, cls, eager):
+        """
+        Build the loader options eager-loading relationships of a class.
+
+        Args:
+            cls (Type): The mapped class being queried.
+            eager (list): Dotted relationship paths; the ones that do not
+            start with a relationship of cls are skipped.
+
+        Returns:
+            list: The loader options to pass to Query.options().
+        """
+        configure_mappers()
+        options = []
+        for path in eager:
+            option = None
+            current = cls
+            for name in path.split('.'):
+                attr = getattr(current, name, None)
+                mapper = getattr(getattr(attr, 'property', None),
+                                 'mapper', None)
+                if mapper is None:
+                    break
+                if option is None:
+                    option = selectinload(attr)
+                else:
+                    option = option.selectinload(attr)
+                current = mapper.class_
+            else:
+                options.append(option)
+        return options
+
+    @contextmanager
+    def count_queries(self):
+        """
+        Record the SQL statements issued inside a with block.
+
+        Yields:
+            list: The statements executed so far, so that tests can
+            assert on len() of it.
+        """
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Append one executed statement."""
+            statements.append(statement)
+
+        event.listen(self.__engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(self.__engine, 'before_cursor_execute', record)
+
     def new(self, obj):
         """
         Add a new object to the current database session.
@@ -48,8 +424,116 @@ class DBStorage:
         """
         self.__session.add(obj)
 
+    def new_many(self, objs):
+        """
+        Add many new objects to the current database session at once.
+        On commit, the rows of each table are inserted with a single
+        executemany() as their primary keys are already set.
+
+        Args:
+            objs (Iterable[BaseModel]): The objects to add.
+        """
+        self.__session.add_all(list(objs))
+
+    def new_records(self, cls, records):
+        """
+        Insert many objects given as to_dict() dictionaries, such as the
+        ones read back from an export, keeping their ids and dates.
+
+        No object is built: the rows are sent at once with one
+        executemany() per set of columns, which is several times faster
+        than new_many() for large imports. The amenity_ids of places
+        become rows of place_amenity, skipping the ids of missing
+        amenities. The rows are committed by save().
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects.
+            records (Iterable[dict]): The dictionaries.
+
+        Returns:
+            int: The number of rows inserted, 0 for a class without a
+            table, such as BaseModel.
+        """
+        mapped = self.__mapped_classes(cls)
+        if not mapped:
+            return 0
+        mapper = inspect(mapped[0])
+        columns = mapper.columns.keys()
+        rows = []
+        links = []
+        for record in records:
+            row = {name: record[name] for name in columns if name in record}
+            for name in ('created_at', 'updated_at'):
+                if isinstance(row.get(name), str):
+                    row[name] = parse_datetime(row[name])
+            rows.append(row)
+            if 'amenities' in mapper.relationships:
+                links.extend({'place_id': row['id'], 'amenity_id': amenity_id}
+                             for amenity_id in record.get('amenity_ids', ()))
+        self.__session.bulk_insert_mappings(mapper, rows)
+        if links:
+            amenity = mapper.relationships['amenities'].mapper.class_
+            found = {amenity_id for amenity_id, in self.__session.query(
+                amenity.id).filter(amenity.id.in_(
+                    {link['amenity_id'] for link in links}))}
+            links = [link for link in links if link['amenity_id'] in found]
+            if links:
+                self.__session.execute(
+                    mapper.relationships['amenities'].secondary.insert(),
+                    links)
+        return len(rows)
+
+    def generation(self):
+        """
+        Return a value that changes whenever the stored objects may have
+        changed, in this process or in another one sharing the database:
+        the single row of the generations table, which save() bumps in
+        the transaction it commits.
+
+        Returns:
+            int: The current generation.
+        """
+        with self.__session.no_autoflush:
+            return self.__session.execute(
+                select(generations.c.value)).scalar()
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer committing to the end of a with block, so that the objects
+        saved inside it, with obj.save() or storage.save(), are inserted
+        in a single transaction.
+
+        If the block raises an exception the transaction is rolled back.
+        A batch inside another one joins it. As the sessions, batches
+        belong to the thread opening them: the saves of other threads
+        are committed as usual.
+
+        Yields:
+            DBStorage: The storage.
+        """
+        batches = DBStorage.__batches
+        batches.depth = getattr(batches, 'depth', 0) + 1
+        try:
+            yield self
+        except BaseException:
+            batches.depth -= 1
+            if not batches.depth:
+                self.__session.rollback()
+            raise
+        else:
+            batches.depth -= 1
+            if not batches.depth:
+                self.save()
+
     def save(self):
-        """Commit all changes to the current database session."""
+        """Commit all changes to the current database session, unless
+        inside batch() in this thread, which commits at its end."""
+        if getattr(DBStorage.__batches, 'depth', 0):
+            return
+        self.__session.execute(generations.update().values(
+            value=generations.c.value + 1))
         self.__session.commit()
 
     def delete(self, obj=None):
@@ -67,6 +551,11 @@ class DBStorage:
         """Create all tables in the database and initialize a new session."""
         from models.base_model import Base
         Base.metadata.create_all(self.__engine)
+        try:
+            with self.__engine.begin() as connection:
+                connection.execute(generations.insert().values(id=1, value=0))
+        except IntegrityError:
+            pass
         Session = sessionmaker(bind=self.__engine, expire_on_commit=False)
         self.__session = scoped_session(Session)
 
@@ -1,7 +1,26 @@
 #!/usr/bin/python3
 """Provides a simple storage system for managing and persisting
 objects in JSON format."""
-import json
+import atexit
+import copy
+import heapq
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from os import getenv
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from models.engine import formats, journal, shards
+from models.engine.columns import ColumnIndex, Table
+from models.engine.indexes import (BitsetIndex, ClassIndex, ForeignKeyIndex,
+                                   ForeignKeyListIndex, GridIndex,
+                                   SortedIndex, TEXT_ATTRIBUTES, TextIndex,
+                                   sort_key)
 
 
 def get_class_name_to_class():
@@ -37,18 +56,93 @@ def get_class_name_to_class():
 
 
 class FileStorage:
-    """Handles the storage and retrieval of objects in JSON format."""
+    """Handles the storage and retrieval of objects in JSON format.
+
+    The objects are kept in memory, indexed as indexes.py describes, and
+    only the objects changed since the last save are serialized again.
+    The HBNB_FILE_* settings listed in the README choose how the file is
+    read and written: a write-ahead log (journal.py), one file per class
+    (shards.py), the format and compression (formats.py), lazy loading,
+    compact objects, column mirrors (columns.py), write-behind and
+    multi-process saving. Incompatible settings raise a RuntimeError at
+    startup.
+    """
 
     __file_path = 'file.json'
     __objects = {}
+    __multiprocess = getenv('HBNB_FILE_MULTIPROCESS') == '1'
+    if __multiprocess and fcntl is None:
+        raise RuntimeError("HBNB_FILE_MULTIPROCESS needs the fcntl module, "
+                           "only available on POSIX systems")
+    __sharded = getenv('HBNB_FILE_SHARDED') == '1'
+    __shards = int(getenv('HBNB_FILE_SHARDS', '1'))
+    __journal = getenv('HBNB_FILE_JOURNAL') == '1'
+    if __multiprocess and (__sharded or __journal):
+        raise RuntimeError("HBNB_FILE_MULTIPROCESS cannot be used with "
+                           "HBNB_FILE_SHARDED or HBNB_FILE_JOURNAL")
+    if __sharded and __journal:
+        raise RuntimeError("HBNB_FILE_SHARDED cannot be used with "
+                           "HBNB_FILE_JOURNAL")
+    __disk_version = None
+    __compact_every = int(getenv('HBNB_FILE_COMPACT_EVERY', '1000'))
+    __pending = {}
+    __log_records = 0
+    __compactor = None
+    __exit_registered = False
+    __disk_signature = None
+    __disk_state = {}
+    __disk_objects = None
+    __by_class = ClassIndex()
+    __by_reference = {name: ForeignKeyIndex(name) for name in
+                      ('state_id', 'city_id', 'place_id', 'user_id')}
+    __by_reference['amenity_ids'] = ForeignKeyListIndex('amenity_ids')
+    __by_name = SortedIndex('name', ('State', 'City', 'Amenity', 'Place'))
+    __by_location = GridIndex(('Place',))
+    __by_text = TextIndex(TEXT_ATTRIBUTES)
+    __by_amenities = BitsetIndex('Place', 'amenity_ids')
+    __watched = {name: [index] for name, index in __by_reference.items()}
+    __watched['amenity_ids'].append(__by_amenities)
+    __watched.update(name=[__by_name], latitude=[__by_location],
+                     longitude=[__by_location])
+    __watched.update(dict.fromkeys(TEXT_ATTRIBUTES.values(), [__by_text]))
+    __generation = 0
+    __lazy = getenv('HBNB_FILE_LAZY') == '1'
+    __raw = {}
+    __indexed_objects = None
+    __batch_depth = 0
+    __batch_saved = False
+    __compact_objects = getenv('HBNB_FILE_COMPACT_OBJECTS') == '1'
+    __strings = {}
+    __columns = ColumnIndex() if getenv('HBNB_FILE_COLUMNS') == '1' else None
+    __fragments = {}
+    __fragment_objects = None
+    __dirty = set()
+    __volatile = set()
+    __loaded = set()
+    __shard_keys = {}
+    __shard_signatures = {}
+    __codec = formats.Codec(getenv('HBNB_FILE_FORMAT', 'json'),
+                            getenv('HBNB_FILE_COMPRESSION'))
+    __write_behind = getenv('HBNB_FILE_WRITE_BEHIND') == '1'
+    __flush_interval = float(getenv('HBNB_FILE_FLUSH_INTERVAL', '1'))
+    __flush_dirty = int(getenv('HBNB_FILE_FLUSH_DIRTY', '1000'))
+    __lock = threading.RLock()
+    __flush_wanted = threading.Condition(__lock)
+    __flusher = None
+    __unflushed = False
+    __flush_now = False
 
-    def all(self, cls=None):
+    def all(self, cls=None, eager=None):
         """
         Retrieve all stored objects of a specified class or all stored
         objects if no class is specified.
 
         Args:
-            cls (Optional[Type]): A class to filter the stored objects by.
+            cls (Optional[Union[Type, str]]): A class, or the name of a
+            class, to filter the stored objects by.
+            eager (Optional[list]): Relationships to load along with the
+            objects; accepted for compatibility with DBStorage, as related
+            objects are already in memory.
 
         Returns:
             dict: A dictionary containing all stored objects of the specified
@@ -56,14 +150,484 @@ class FileStorage:
         """
 
         if cls is not None:
-            cls_objects = {}
-            for key, obj in self.__objects.items():
-                if isinstance(obj, cls):
-                    cls_objects[key] = obj
-            return cls_objects
+            if isinstance(cls, str):
+                cls = get_class_name_to_class().get(cls)
+                if cls is None:
+                    return {}
+            self.__hydrate(cls)
+            self.__indexes()
+            return FileStorage.__by_class.lookup(cls)
 
+        self.__hydrate()
         return self.__objects
 
+    def __hydrate(self, cls=None):
+        """
+        Build the objects read lazily from the file that have not been
+        accessed yet.
+
+        Args:
+            cls (Optional[Type]): Only build the objects of this class and
+            of its subclasses.
+        """
+        with FileStorage.__lock:
+            needed_clss = get_class_name_to_class()
+            if FileStorage.__sharded:
+                self.__load(name for name, clss in needed_clss.items()
+                            if cls is None or issubclass(clss, cls))
+            if not FileStorage.__raw:
+                return
+            items = []
+            for class_name in list(FileStorage.__raw):
+                if cls is None or issubclass(needed_clss[class_name], cls):
+                    clss = needed_clss[class_name]
+                    raw = FileStorage.__raw.pop(class_name)
+                    for key, obj_dict in raw.items():
+                        items.append((key, self.__build(clss, obj_dict)))
+            if items:
+                self.__put_many(items)
+                FileStorage.__dirty.difference_update(key
+                                                      for key, obj in items)
+
+    def __load(self, class_names):
+        """
+        Read the files of the classes not read yet, in sharded mode.
+
+        Args:
+            class_names (Iterable[str]): The names of the classes.
+        """
+        with FileStorage.__lock:
+            for class_name in class_names:
+                if class_name not in FileStorage.__loaded:
+                    FileStorage.__loaded.add(class_name)
+                    for path in shards.shard_paths(FileStorage.__file_path,
+                                                   class_name,
+                                                   FileStorage.__shards):
+                        self.__read_shard(path)
+
+    def __build(self, cls, obj_dict):
+        """
+        Build an object from its dictionary, sharing its values with the
+        other objects in compact mode.
+
+        Args:
+            cls (Type): The class of the object.
+            obj_dict (dict): The dictionary read from the file.
+
+        Returns:
+            The new object.
+        """
+        if not FileStorage.__compact_objects:
+            return cls(**obj_dict)
+        strings = FileStorage.__strings
+        for name in FileStorage.__by_reference:
+            value = obj_dict.get(name)
+            if isinstance(value, str):
+                obj_dict[name] = strings.setdefault(value, value)
+            elif isinstance(value, list):
+                obj_dict[name] = [strings.setdefault(item, item)
+                                  if isinstance(item, str) else item
+                                  for item in value]
+        obj = cls(**obj_dict)
+        created_at = getattr(obj, 'created_at', None)
+        if created_at is not None and \
+                getattr(obj, 'updated_at', None) == created_at:
+            object.__setattr__(obj, 'updated_at', created_at)
+        return obj
+
+    def query(self, cls, filters=None, order_by=None, limit=None, offset=0,
+              eager=None):
+        """
+        Retrieve one page of the objects of a class matching filters.
+
+        When a filter is on an indexed foreign key, only the objects
+        referring to that id are examined. Otherwise, objects ordered by
+        name are read in order from the name index, stopping once the
+        page is full.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects to retrieve.
+            filters (Optional[dict]): Attribute values the objects must
+            be equal to.
+            order_by (Optional[str]): The attribute to sort by, prefixed
+            with "-" for descending order.
+            limit (Optional[int]): The maximum number of objects returned.
+            offset (int): The number of matching objects to skip.
+            eager (Optional[list]): Accepted for compatibility with
+            DBStorage.
+
+        Returns:
+            list: The matching objects, in order; none for an unknown
+            class name.
+        """
+        if isinstance(cls, str):
+            cls = get_class_name_to_class().get(cls)
+            if cls is None:
+                return []
+        self.__hydrate(cls)
+        filters = filters or {}
+        candidates = None
+        for attribute, value in filters.items():
+            index = FileStorage.__by_reference.get(attribute)
+            if type(index) is ForeignKeyIndex:
+                candidates = self.related(cls, attribute, value)
+                break
+
+        def matches(obj):
+            """Tell whether an object passes every filter."""
+            return all(getattr(obj, attribute, None) == value
+                       for attribute, value in filters.items())
+
+        end = None if limit is None else offset + limit
+        if order_by is not None:
+            attribute = order_by.lstrip('-')
+            reverse = order_by.startswith('-')
+            self.__indexes()
+            if candidates is None and \
+                    FileStorage.__by_name.covers(cls, attribute):
+                ordered = FileStorage.__by_name.ordered(cls, reverse)
+                return list(itertools.islice(filter(matches, ordered),
+                                             offset, end))
+
+        if candidates is None:
+            candidates = self.all(cls).values()
+        objs = [obj for obj in candidates if matches(obj)]
+        if order_by is not None:
+
+            def attribute_key(obj):
+                """Sort by the attribute, missing values first."""
+                return sort_key(getattr(obj, attribute, None))
+
+            if limit is not None:
+                select = heapq.nlargest if reverse else heapq.nsmallest
+                objs = select(end, objs, key=attribute_key)
+            else:
+                objs.sort(key=attribute_key, reverse=reverse)
+        return objs[offset:end]
+
+    def stream(self, cls=None, batch_size=1000, eager=None):
+        """
+        Iterate over the stored objects, mirroring DBStorage.stream().
+
+        Args:
+            cls (Optional[Union[Type, str]]): A class, or the name of a
+            class, to filter the stored objects by.
+            batch_size (int): Unused, as the objects are in memory.
+            eager (Optional[list]): Unused, as relationships are
+            resolved through the indexes.
+
+        Yields:
+            The matching objects.
+        """
+        for obj in list(self.all(cls).values()):
+            yield obj
+
+    def get(self, cls, id):
+        """
+        Retrieve one object by class and id.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the object.
+            id (str): The id of the object.
+
+        Returns:
+            The object, or None if it is not stored.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if FileStorage.__sharded and cls in get_class_name_to_class():
+            self.__load([cls])
+        key = f'{cls}.{id}'
+        obj = FileStorage.__objects.get(key)
+        if obj is None and key in FileStorage.__raw.get(cls, {}):
+            with FileStorage.__lock:
+                obj_dict = FileStorage.__raw[cls].pop(key)
+                obj = self.__build(get_class_name_to_class()[cls], obj_dict)
+                self.__put(key, obj)
+                FileStorage.__dirty.discard(key)
+        return obj
+
+    def related(self, cls, attribute, value):
+        """
+        Retrieve the objects of a class whose foreign key attribute
+        refers to a given id.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects to retrieve.
+            attribute (str): The name of the foreign key attribute.
+            value (str): The id the attribute must be equal to.
+
+        Returns:
+            list: The matching objects; none for an unknown class name.
+        """
+        if isinstance(cls, str):
+            cls = get_class_name_to_class().get(cls)
+            if cls is None:
+                return []
+        self.__hydrate(cls)
+        self.__indexes()
+        if attribute in FileStorage.__by_reference:
+            return FileStorage.__by_reference[attribute].lookup(cls, value)
+        return [obj for obj in FileStorage.__by_class.lookup(cls).values()
+                if getattr(obj, attribute, None) == value]
+
+    def search(self, cls, text, limit=None):
+        """
+        Retrieve the objects of a class whose text contains every word of
+        a query, ignoring case: places by description and reviews by text.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects to retrieve.
+            text (str): The words to search for.
+            limit (Optional[int]): The maximum number of objects returned.
+
+        Returns:
+            list: The matching objects, in no particular order; none for
+            a class without a text attribute.
+        """
+        if isinstance(cls, str):
+            cls = get_class_name_to_class().get(cls)
+            if cls is None:
+                return []
+        self.__hydrate(cls)
+        self.__indexes()
+        return FileStorage.__by_text.search(cls, text)[:limit]
+
+    def search_places(self, amenity_ids=None, state_ids=None, city_ids=None,
+                      match_all=True, limit=None, offset=0, eager=None):
+        """
+        Retrieve the places having some amenities, in some locations.
+
+        The places with each amenity are kept as the bits of an integer,
+        so that the amenities are combined with bitwise AND or OR, and
+        then intersected with the places of the locations.
+
+        Args:
+            amenity_ids (Optional[Iterable[str]]): The ids of the
+            amenities the places must have.
+            state_ids (Optional[Iterable[str]]): The ids of states; places
+            in any city of them are selected.
+            city_ids (Optional[Iterable[str]]): The ids of cities; places
+            in any of them are selected, in addition to those of states.
+            match_all (bool): Require every amenity rather than any one.
+            limit (Optional[int]): The maximum number of places returned.
+            offset (int): The number of matching places to skip.
+            eager (Optional[list]): Accepted for compatibility with
+            DBStorage.
+
+        Returns:
+            list: The matching places, ordered by name.
+        """
+        clss = get_class_name_to_class()
+        self.__hydrate(clss['Place'])
+        self.__hydrate(clss['City'])
+        self.__indexes()
+        index = FileStorage.__by_amenities
+        bits = index.having(amenity_ids or (), match_all)
+        city_ids = set(city_ids or ())
+        for state_id in state_ids or ():
+            city_ids.update(city.id for city in
+                            self.related(clss['City'], 'state_id', state_id))
+        if state_ids or city_ids:
+            by_city = FileStorage.__by_reference['city_id']
+            bits &= index.from_keys(
+                f'Place.{place.id}' for city_id in city_ids
+                for place in by_city.lookup(clss['Place'], city_id))
+        places = index.members(bits)
+        places.sort(key=lambda place: sort_key(place.name))
+        end = None if limit is None else offset + limit
+        return places[offset:end]
+
+    def places_near(self, latitude, longitude, radius, limit=None,
+                    eager=None):
+        """
+        Retrieve the places within a distance of a point.
+
+        Args:
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            radius (float): The distance, in kilometers.
+            limit (Optional[int]): The maximum number of places returned.
+            eager (Optional[list]): Accepted for compatibility with
+            DBStorage.
+
+        Returns:
+            list: The places, nearest first.
+        """
+        cls = get_class_name_to_class()['Place']
+        self.__hydrate(cls)
+        self.__indexes()
+        found = FileStorage.__by_location.near(cls, latitude, longitude,
+                                               radius)
+        return [place for distance, place in found[:limit]]
+
+    def aggregate(self, cls, func='count', attribute=None, filters=None,
+                  group_by=None):
+        """
+        Compute an aggregate over the objects of a class, like SQL's
+        COUNT, SUM, MIN, MAX and AVG.
+
+        The aggregate is computed on the columns mirroring the objects,
+        vectorized with NumPy when it is installed. Without
+        HBNB_FILE_COLUMNS the columns are built for the call, except for
+        a plain count of the objects, which the class index answers.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects; objects of its subclasses are not included.
+            func (str): One of count, sum, min, max and avg.
+            attribute (Optional[str]): The numeric attribute to aggregate,
+            such as price_by_night; count without one counts the objects.
+            filters (Optional[dict]): Numeric or foreign key attribute
+            values the objects must be equal to. The value for a numeric
+            attribute can also be a (low, high) tuple of inclusive bounds,
+            either of which may be None.
+            group_by (Optional[str]): A foreign key attribute, such as
+            city_id, to compute one aggregate per referenced id.
+
+        Returns:
+            The aggregate, None if there was nothing to aggregate, or a
+            dictionary of aggregates by id when group_by is given.
+        """
+        if isinstance(cls, str):
+            cls = get_class_name_to_class().get(cls)
+        if cls is None:
+            table = Table('')
+        elif func == 'count' and attribute is None and not filters and \
+                group_by is None:
+            if FileStorage.__sharded:
+                self.__load([cls.__name__])
+            self.__indexes()
+            return FileStorage.__by_class.count(cls) + \
+                len(FileStorage.__raw.get(cls.__name__, ()))
+        elif FileStorage.__columns is not None:
+            self.__hydrate(cls)
+            self.__indexes()
+            table = FileStorage.__columns.table(cls)
+        else:
+            table = Table(cls.__name__)
+            for key, obj in self.all(cls).items():
+                if type(obj) is cls:
+                    table.put(key, obj)
+        return table.aggregate(func, attribute, filters, group_by)
+
+    def changed(self, obj, name, old):
+        """
+        Keep the indexes up to date after an attribute of an object
+        has been set, and mark the object to be saved again.
+
+        Args:
+            obj: The object whose attribute was set.
+            name (str): The name of the attribute.
+            old: The previous value of the attribute, or None.
+        """
+        with FileStorage.__lock:
+            key = f"{obj.__class__.__name__}.{obj.__dict__.get('id')}"
+            if FileStorage.__objects.get(key) is not obj:
+                return
+            self.__touch(key)
+            if FileStorage.__journal:
+                FileStorage.__pending[key] = obj
+            watchers = FileStorage.__watched.get(name, [])
+            columns = FileStorage.__columns
+            if columns is not None and name in columns.attributes:
+                watchers = watchers + [columns]
+            if watchers:
+                self.__indexes()
+                for index in watchers:
+                    index.move(key, obj, old)
+
+    def __touch(self, key):
+        """
+        Mark the object stored under a key as dirty, so that the next
+        save() serializes it again.
+
+        Args:
+            key (str): The storage key of the object.
+        """
+        FileStorage.__fragments.pop(key, None)
+        FileStorage.__dirty.add(key)
+
+    def __indexes(self):
+        """
+        Return the indexes, rebuilding them first if __objects has been
+        replaced since they were built.
+
+        Returns:
+            list: The up to date indexes.
+        """
+        indexes = [FileStorage.__by_class, FileStorage.__by_name,
+                   FileStorage.__by_location, FileStorage.__by_text,
+                   FileStorage.__by_amenities]
+        indexes.extend(FileStorage.__by_reference.values())
+        if FileStorage.__columns is not None:
+            indexes.append(FileStorage.__columns)
+        if FileStorage.__indexed_objects is not FileStorage.__objects:
+            for index in indexes:
+                index.clear()
+                index.add_many(FileStorage.__objects.items())
+            FileStorage.__indexed_objects = FileStorage.__objects
+        return indexes
+
+    def __put(self, key, obj):
+        """
+        Store an object under a key, keeping the indexes up to date.
+
+        Args:
+            key (str): The storage key of the object.
+            obj: The object to store.
+        """
+        indexes = self.__indexes()
+        old = FileStorage.__objects.get(key)
+        if old is not None and old is not obj:
+            for index in indexes:
+                index.discard(key, old)
+        FileStorage.__objects[key] = obj
+        self.__touch(key)
+        for index in indexes:
+            index.add(key, obj)
+
+    def __put_many(self, items):
+        """
+        Store many objects at once, keeping the indexes up to date.
+
+        Args:
+            items (list): The (key, object) pairs to store.
+        """
+        indexes = self.__indexes()
+        for key, obj in items:
+            old = FileStorage.__objects.get(key)
+            if old is not None and old is not obj:
+                for index in indexes:
+                    index.discard(key, old)
+            FileStorage.__objects[key] = obj
+            self.__touch(key)
+        for index in indexes:
+            index.add_many(items)
+
+    def __pop(self, key):
+        """
+        Remove the object stored under a key, keeping the indexes up
+        to date.
+
+        Args:
+            key (str): The storage key of the object.
+
+        Returns:
+            The removed object, or None if there was none.
+        """
+        indexes = self.__indexes()
+        obj = FileStorage.__objects.pop(key, None)
+        if obj is not None:
+            self.__touch(key)
+            for index in indexes:
+                index.discard(key, obj)
+        return obj
+
     def new(self, obj):
         """
         Add a new object to the storage.
@@ -71,31 +635,565 @@ class FileStorage:
         Args:
             obj: An object to be stored.
         """
-        obj_name = f'{obj.__class__.__name__}.{obj.id}'
-        FileStorage.__objects[obj_name] = obj
+        with FileStorage.__lock:
+            obj_name = f'{obj.__class__.__name__}.{obj.id}'
+            if FileStorage.__sharded:
+                self.__load([obj.__class__.__name__])
+            self.__put(obj_name, obj)
+            if FileStorage.__raw:
+                FileStorage.__raw.get(obj.__class__.__name__, {}).pop(obj_name,
+                                                                      None)
+            if FileStorage.__journal:
+                FileStorage.__pending[obj_name] = obj
+
+    def new_many(self, objs):
+        """
+        Add many new objects to the storage at once, updating the
+        indexes in bulk.
+
+        Args:
+            objs (Iterable): The objects to be stored.
+        """
+        with FileStorage.__lock:
+            items = [(f'{obj.__class__.__name__}.{obj.id}', obj)
+                     for obj in objs]
+            if FileStorage.__sharded:
+                self.__load({obj.__class__.__name__ for key, obj in items})
+            self.__put_many(items)
+            for key, obj in items:
+                if FileStorage.__raw:
+                    FileStorage.__raw.get(obj.__class__.__name__, {}).pop(key,
+                                                                          None)
+                if FileStorage.__journal:
+                    FileStorage.__pending[key] = obj
+
+    def new_records(self, cls, records):
+        """
+        Add many objects given as to_dict() dictionaries, such as the
+        ones read back from an export, keeping their ids and dates.
+
+        Args:
+            cls (Union[Type, str]): The class, or the name of the class,
+            of the objects.
+            records (Iterable[dict]): The dictionaries.
+
+        Returns:
+            int: The number of objects added, 0 for an unknown class
+            name.
+        """
+        if isinstance(cls, str):
+            cls = get_class_name_to_class().get(cls)
+            if cls is None:
+                return 0
+        objs = [self.__build(cls, dict(record)) for record in records]
+        self.new_many(objs)
+        return len(objs)
+
+    def generation(self):
+        """
+        Return a number that changes whenever the stored objects may
+        have changed: on save(), delete() and on a reload() that picked
+        up changes from disk.
+
+        In multi-process mode, the changes saved by other processes are
+        reloaded first.
+
+        Returns:
+            int: The current generation.
+        """
+        if FileStorage.__multiprocess:
+            self.reload()
+        return FileStorage.__generation
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer saving to the end of a with block, so that the objects
+        saved inside it, with obj.save() or storage.save(), are written
+        to the file at once.
+
+        If the block raises an exception nothing is written, and the
+        stored objects are rebuilt from the file as it was last saved.
+        In write-behind mode, the saves not written yet are flushed
+        before the block, so that they are not rolled back.
+        A batch inside another one joins it. The stored objects are
+        shared by all threads, so the saves made by other threads during
+        the block are deferred along with it.
+
+        Yields:
+            FileStorage: The storage.
+        """
+        with FileStorage.__lock:
+            if not FileStorage.__batch_depth:
+                self.flush()
+            FileStorage.__batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            with FileStorage.__lock:
+                FileStorage.__batch_depth -= 1
+                if not FileStorage.__batch_depth:
+                    FileStorage.__batch_saved = False
+                    self.__rollback()
+            raise
+        else:
+            with FileStorage.__lock:
+                FileStorage.__batch_depth -= 1
+                if not FileStorage.__batch_depth and \
+                        FileStorage.__batch_saved:
+                    FileStorage.__batch_saved = False
+                    self.save()
+
+    def __rollback(self):
+        """Discard the changes made since the last save by rebuilding
+        the stored objects from the file."""
+        with FileStorage.__lock:
+            FileStorage.__objects.clear()
+            FileStorage.__indexed_objects = None
+            FileStorage.__raw = {}
+            FileStorage.__pending.clear()
+            FileStorage.__fragments.clear()
+            FileStorage.__dirty.clear()
+            FileStorage.__loaded.clear()
+            FileStorage.__shard_keys.clear()
+            FileStorage.__shard_signatures.clear()
+            FileStorage.__disk_state = {}
+            FileStorage.__disk_signature = None
+            FileStorage.__generation += 1
+            self.reload()
 
     def save(self):
-        """Save the current state of stored objects to the JSON file."""
+        """Save the current state of stored objects to the JSON file.
+
+        In journal mode only the objects added or deleted since the last
+        save are appended to the log. Inside batch(), saving is deferred
+        to the end of the batch. In write-behind mode, the writing is
+        left to the background thread.
+        """
+        with FileStorage.__lock:
+            if FileStorage.__batch_depth:
+                FileStorage.__batch_saved = True
+                return
+            FileStorage.__generation += 1
+            if not FileStorage.__write_behind:
+                self.__write()
+                return
+            FileStorage.__unflushed = True
+            self.__start_flusher()
+            dirty = (FileStorage.__pending if FileStorage.__journal
+                     else FileStorage.__dirty)
+            if len(dirty) >= FileStorage.__flush_dirty:
+                FileStorage.__flush_now = True
+                FileStorage.__flush_wanted.notify()
+
+    def flush(self):
+        """Write the saves deferred in write-behind mode now, and do
+        nothing when none is waiting."""
+        with FileStorage.__lock:
+            FileStorage.__flush_now = False
+            if FileStorage.__unflushed:
+                self.__write()
+                FileStorage.__unflushed = False
+
+    def __start_flusher(self):
+        """Start the background thread of write-behind mode, unless it
+        is running."""
+        flusher = FileStorage.__flusher
+        if flusher is not None and flusher.is_alive():
+            return
+        self.__register_exit()
+        flusher = threading.Thread(target=self.__flush_loop, daemon=True)
+        FileStorage.__flusher = flusher
+        flusher.start()
+
+    def __register_exit(self):
+        """Register __exit() to run when the program exits, the first
+        time a background thread is started."""
+        if not FileStorage.__exit_registered:
+            FileStorage.__exit_registered = True
+            atexit.register(self.__exit)
+
+    def __exit(self):
+        """Write the saves deferred in write-behind mode, then wait for
+        the background compaction, which the program would otherwise
+        kill at exit, leaving the sealed log to replay on every start."""
+        self.flush()
+        self.__wait_compaction()
+
+    def __flush_loop(self):
+        """Flush every HBNB_FILE_FLUSH_INTERVAL seconds, or when save()
+        wakes the thread up."""
+        with FileStorage.__lock:
+            while True:
+                FileStorage.__flush_wanted.wait_for(
+                    lambda: FileStorage.__flush_now,
+                    FileStorage.__flush_interval)
+                self.flush()
+
+    def __write(self):
+        """Write the stored objects to disk."""
+        if FileStorage.__sharded:
+            self.__save_shards()
+            return
+        log_path = FileStorage.__file_path + '.log'
+        if FileStorage.__journal:
+            records = []
+            for key, obj in FileStorage.__pending.items():
+                if obj is None:
+                    records.append(['del', key])
+                else:
+                    records.append(['put', key, obj.to_dict()])
+            FileStorage.__pending.clear()
+            journal.append(log_path, records)
+            FileStorage.__log_records += len(records)
+            if FileStorage.__log_records >= FileStorage.__compact_every:
+                self.compact()
+            if FileStorage.__disk_objects is FileStorage.__objects:
+                for record in records:
+                    if FileStorage.__compact_objects:
+                        FileStorage.__disk_state[record[1]] = None
+                    elif record[0] == 'put':
+                        FileStorage.__disk_state[record[1]] = record[2]
+                    else:
+                        FileStorage.__disk_state.pop(record[1], None)
+                FileStorage.__disk_signature = self.__signature()
+            return
+        if FileStorage.__multiprocess:
+            self.__write_shared()
+        else:
+            self.__write_file()
+
+    def __write_shared(self):
+        """Write the single file in multi-process mode, holding the lock
+        file and reading back first the saves of other processes."""
+        fd = os.open(FileStorage.__file_path + '.lock',
+                     os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            version = os.pread(fd, 20, 0)
+            if version != FileStorage.__disk_version and \
+                    FileStorage.__disk_objects is FileStorage.__objects:
+                self.__refresh()
+            self.__write_file()
+            version = b'%020d' % (int(version or 0) + 1)
+            os.pwrite(fd, version, 0)
+            FileStorage.__disk_version = version
+        finally:
+            os.close(fd)
 
-        obj_dict = {}
+    def __refresh(self):
+        """Bring in the objects saved by other processes, leaving out the
+        dirty objects, which are about to be written over them."""
+        try:
+            json_file = formats.load(FileStorage.__file_path)
+        except FileNotFoundError:
+            json_file = {}
+        dirty = FileStorage.__dirty
+        self.__merge({key: obj_dict for key, obj_dict in json_file.items()
+                      if key not in dirty},
+                     {key: obj_dict
+                      for key, obj_dict in FileStorage.__disk_state.items()
+                      if key not in dirty})
+        if FileStorage.__compact_objects:
+            json_file = dict.fromkeys(json_file)
+        FileStorage.__disk_state = json_file
+
+    def __write_file(self):
+        """Write the single file."""
+        log_path = FileStorage.__file_path + '.log'
+        self.__prepare_save()
+        FileStorage.__dirty.clear()
+        parts = []
+        for raw in FileStorage.__raw.values():
+            for key, obj_dict in raw.items():
+                parts.append(self.__fragment(key, obj_dict))
         for key, value in FileStorage.__objects.items():
-            obj_dict[key] = value.to_dict()
+            parts.append(self.__fragment(key, value))
+
+        self.__wait_compaction()
+        shards.write(FileStorage.__file_path,
+                     FileStorage.__codec.encode(parts))
+        journal.discard(log_path, log_path + '.1')
+        FileStorage.__disk_objects = FileStorage.__objects
+        FileStorage.__disk_signature = self.__signature()
+
+    def __prepare_save(self):
+        """
+        Forget the JSON text and the dictionaries on disk that no longer
+        hold, before writing.
+
+        Returns:
+            bool: Whether __objects was replaced since it was last read
+            or written, so that every object must be written.
+        """
+        if FileStorage.__fragment_objects is not FileStorage.__objects:
+            FileStorage.__fragments.clear()
+            FileStorage.__fragment_objects = FileStorage.__objects
+        replaced = FileStorage.__disk_objects is not FileStorage.__objects
+        if replaced:
+            FileStorage.__disk_state = {}
+        for key in FileStorage.__dirty:
+            if self.__source(key) is None:
+                FileStorage.__disk_state.pop(key, None)
+        return replaced
+
+    def __source(self, key):
+        """
+        Find what is stored under a key.
+
+        Args:
+            key (str): The storage key.
 
-        with open(FileStorage.__file_path, 'w') as json_file:
-            json.dump(obj_dict, json_file)
+        Returns:
+            The object, or the dictionary read lazily from disk, or None
+            if nothing is stored under the key.
+        """
+        obj = FileStorage.__objects.get(key)
+        if obj is None:
+            obj = FileStorage.__raw.get(key.partition('.')[0], {}).get(key)
+        return obj
+
+    def __fragment(self, key, source):
+        """
+        Return an object encoded as written to disk, encoding it only if
+        it is dirty.
+
+        The encoding is not kept for an object holding a plain list,
+        dictionary or set, which can change in place without the storage
+        knowing; Place.amenity_ids reports such changes itself.
+
+        Args:
+            key (str): The storage key of the object.
+            source: The object, or the dictionary read lazily from disk.
+
+        Returns:
+            The result of the codec's fragment(), such as the "key": {...}
+            text of JSON.
+        """
+        fragment = FileStorage.__fragments.get(key)
+        if fragment is not None:
+            return fragment
+        obj_dict = source if isinstance(source, dict) else source.to_dict()
+        fragment = FileStorage.__codec.fragment(key, obj_dict)
+        volatile = not isinstance(source, dict) and any(
+            type(value) in (list, dict, set)
+            for value in source.__dict__.values())
+        if volatile:
+            FileStorage.__volatile.add(key)
+        else:
+            FileStorage.__volatile.discard(key)
+        if FileStorage.__compact_objects:
+            FileStorage.__disk_state[key] = None
+        elif volatile:
+            FileStorage.__disk_state[key] = copy.deepcopy(obj_dict)
+        else:
+            FileStorage.__disk_state[key] = obj_dict
+            if FileStorage.__codec.cached:
+                FileStorage.__fragments[key] = fragment
+        return fragment
+
+    def __save_shards(self):
+        """Write the files of sharded mode holding dirty objects, or every
+        file when __objects was replaced."""
+        file_path = FileStorage.__file_path
+        count = FileStorage.__shards
+        members = {}
+        if self.__prepare_save():
+            class_names = get_class_name_to_class()
+            for class_name in class_names:
+                for path in shards.shard_paths(file_path, class_name, count):
+                    members[path] = set()
+            keys = itertools.chain(FileStorage.__objects,
+                                   *FileStorage.__raw.values())
+            FileStorage.__loaded.update(class_names)
+            FileStorage.__disk_objects = FileStorage.__objects
+        else:
+            FileStorage.__volatile = {key for key in FileStorage.__volatile
+                                      if self.__source(key) is not None}
+            keys = FileStorage.__dirty | FileStorage.__volatile
+        for key in keys:
+            path = shards.locate(file_path, key, count)
+            if path not in members:
+                members[path] = set(FileStorage.__shard_keys.get(path, ()))
+            members[path].add(key)
+        FileStorage.__dirty.clear()
+        for path, keys in members.items():
+            parts = []
+            present = set()
+            for key in keys:
+                source = self.__source(key)
+                if source is not None:
+                    parts.append(self.__fragment(key, source))
+                    present.add(key)
+            if not present and shards.signature(path) is None:
+                continue
+            shards.write(path, FileStorage.__codec.encode(parts))
+            FileStorage.__shard_keys[path] = present
+            FileStorage.__shard_signatures[path] = shards.signature(path)
+
+    def compact(self, wait=False):
+        """
+        Fold the write-ahead log into the JSON file.
+
+        The active log is sealed and merged into the JSON file by a
+        background thread while new writes go to a fresh log.
+
+        Args:
+            wait (bool): Block until the merge has finished.
+        """
+        compactor = FileStorage.__compactor
+        if compactor is None or not compactor.is_alive():
+            log_path = FileStorage.__file_path + '.log'
+            sealed_path = log_path + '.1'
+            if not os.path.exists(sealed_path):
+                if not os.path.exists(log_path):
+                    return
+                os.replace(log_path, sealed_path)
+                FileStorage.__log_records = 0
+            compactor = threading.Thread(target=journal.compact,
+                                         args=(FileStorage.__file_path,
+                                               sealed_path,
+                                               FileStorage.__codec),
+                                         daemon=True)
+            FileStorage.__compactor = compactor
+            self.__register_exit()
+            compactor.start()
+        if wait:
+            compactor.join()
+
+    def __wait_compaction(self):
+        """Block until a running background compaction has finished."""
+        if FileStorage.__compactor is not None:
+            FileStorage.__compactor.join()
+
+    def __signature(self):
+        """
+        Describe the current version of the files on disk.
+
+        Returns:
+            tuple: The inode, modification time and size of the JSON file
+            and of the log files, or None for the missing ones.
+        """
+        return tuple(shards.signature(path)
+                     for path in (FileStorage.__file_path,
+                                  FileStorage.__file_path + '.log.1',
+                                  FileStorage.__file_path + '.log'))
 
     def reload(self):
-        """deserializes the JSON file to __objects"""
+        """deserializes the JSON file and its write-ahead log
+        to __objects, skipping the work when nothing changed on disk"""
+        with FileStorage.__lock:
+            if FileStorage.__sharded:
+                self.__reload_shards()
+                return
+            log_path = self.__file_path + '.log'
+            self.__wait_compaction()
+            replaced = FileStorage.__disk_objects is not self.__objects
+            if replaced:
+                shards.merge(self.__file_path, get_class_name_to_class(),
+                             FileStorage.__codec)
+                FileStorage.__disk_state = {}
+            signature = self.__signature()
+            if not replaced and signature == FileStorage.__disk_signature:
+                return
+            try:
+                json_file = formats.load(self.__file_path)
+            except FileNotFoundError:
+                json_file = {}
+            journal.replay(log_path + '.1', json_file)
+            FileStorage.__log_records = journal.replay(log_path, json_file)
+            self.__merge(json_file, FileStorage.__disk_state)
+            if FileStorage.__compact_objects:
+                json_file = dict.fromkeys(json_file)
+            FileStorage.__disk_state = json_file
+            FileStorage.__disk_objects = self.__objects
+            FileStorage.__disk_signature = signature
+
+    def __reload_shards(self):
+        """Reload in sharded mode: convert the files to the sharded layout
+        on the first call, then read again the changed files of the
+        classes already read; the others are read on first access."""
+        if FileStorage.__disk_objects is not FileStorage.__objects:
+            shards.migrate(FileStorage.__file_path, get_class_name_to_class(),
+                           FileStorage.__shards, FileStorage.__codec)
+            FileStorage.__disk_state = {}
+            FileStorage.__loaded.clear()
+            FileStorage.__shard_keys.clear()
+            FileStorage.__shard_signatures.clear()
+            FileStorage.__disk_objects = FileStorage.__objects
+        for class_name in list(FileStorage.__loaded):
+            for path in shards.shard_paths(FileStorage.__file_path,
+                                           class_name, FileStorage.__shards):
+                self.__read_shard(path)
+
+    def __read_shard(self, path):
+        """
+        Read one file of sharded mode if it changed since it was last
+        read or written.
+
+        Args:
+            path (str): The path of the file.
+        """
+        signature = shards.signature(path)
+        if signature == FileStorage.__shard_signatures.get(path):
+            return
+        json_file = shards.read(path)
+        disk_state = FileStorage.__disk_state
+        previous = {key: disk_state.get(key)
+                    for key in FileStorage.__shard_keys.get(path, ())}
+        self.__merge(json_file, previous)
+        for key in previous.keys() - json_file.keys():
+            disk_state.pop(key, None)
+        if FileStorage.__compact_objects:
+            disk_state.update(dict.fromkeys(json_file))
+        else:
+            disk_state.update(json_file)
+        FileStorage.__shard_keys[path] = set(json_file)
+        FileStorage.__shard_signatures[path] = signature
+
+    def __merge(self, json_file, previous):
+        """
+        Bring the stored objects in line with the dictionaries read from
+        disk, rebuilding only the objects whose dictionary differs from
+        the one last read or written.
+
+        Args:
+            json_file (dict): The dictionaries read, by key.
+            previous (dict): The dictionaries last read or written for
+            the same file, by key.
+        """
         needed_clss = get_class_name_to_class()
-        try:
-            with open(self.__file_path, 'r') as f:
-                json_file = json.load(f)
-            for key in json_file:
-                class_name = json_file[key]["__class__"]
-                obj_dict = json_file[key]
-                self.__objects[key] = needed_clss[class_name](**obj_dict)
-        except FileNotFoundError:
-            pass
+        generation = FileStorage.__generation
+        raw = FileStorage.__raw
+        rebuilt = []
+        for key in json_file:
+            class_name = json_file[key]["__class__"]
+            obj_dict = json_file[key]
+            if key in self.__objects:
+                if previous.get(key) != obj_dict:
+                    rebuilt.append((key, self.__build(needed_clss[class_name],
+                                                      obj_dict)))
+            elif FileStorage.__lazy:
+                bucket = raw.setdefault(class_name, {})
+                if key not in bucket or previous.get(key) != obj_dict:
+                    bucket[key] = obj_dict
+                    FileStorage.__fragments.pop(key, None)
+                    FileStorage.__generation = generation + 1
+            else:
+                rebuilt.append((key, self.__build(needed_clss[class_name],
+                                                  obj_dict)))
+        if rebuilt:
+            self.__put_many(rebuilt)
+            FileStorage.__generation = generation + 1
+        removed = previous.keys() - json_file.keys()
+        for key in removed:
+            if raw.get(key.partition('.')[0], {}).pop(key, None) is not None:
+                FileStorage.__fragments.pop(key, None)
+            if self.__pop(key) is not None:
+                FileStorage.__generation = generation + 1
+        # The objects now match the disk, so they are not dirty.
+        FileStorage.__dirty.difference_update(key for key, obj in rebuilt)
+        FileStorage.__dirty.difference_update(removed)
 
     def delete(self, obj=None):
         """
@@ -104,11 +1202,17 @@ class FileStorage:
         Args:
             obj (Optional[object]): The object to delete from storage.
         """
-        if obj is not None:
-            obj_name = f'{obj.__class__.__name__}.{obj.id}'
-            if obj_name in self.__objects:
-                self.__objects.pop(obj_name)
+        with FileStorage.__lock:
+            if obj is not None:
+                obj_name = f'{obj.__class__.__name__}.{obj.id}'
+                if FileStorage.__sharded:
+                    self.__load([obj.__class__.__name__])
+                if obj_name in self.__objects:
+                    self.__pop(obj_name)
+                    FileStorage.__generation += 1
+                    if FileStorage.__journal:
+                        FileStorage.__pending[obj_name] = None
 
     def close(self):
-        """deserializing the JSON file to objects"""
+        """deserializing the JSON file to objects if it has changed"""
         self.reload()
@@ -0,0 +1,383 @@
+#!/usr/bin/python3
+"""Provides the file formats FileStorage saves to, chosen with
+HBNB_FILE_FORMAT, and their optional compression, chosen with
+HBNB_FILE_COMPRESSION.
+
+The formats are:
+    json: the text of the json module, as file.json has always held.
+    orjson: the same JSON, encoded and decoded by orjson.
+    msgpack: MessagePack, a binary equivalent of JSON.
+    compact: the objects grouped by class and by set of attributes, each
+    group holding the attribute names once and a row of values per
+    object, encoded with MessagePack when it is installed and as JSON
+    otherwise. Nothing is unpickled when reading it.
+
+The compressions are gzip and zstd. Reading a file does not depend on
+the configuration: the compression and the format are detected from
+the first bytes of the file. orjson, msgpack and zstandard are optional
+packages, needed only by the formats or the compression using them.
+"""
+import gzip
+import json
+import struct
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPACT_MAGIC = b'HBNB\x01'
+
+
+def require(module, package, feature):
+    """
+    Check that an optional package is installed.
+
+    Args:
+        module: The imported module, or None if it is missing.
+        package (str): The name of the package.
+        feature (str): What needs the package, for the error message.
+
+    Raises:
+        ImportError: If the package is missing.
+    """
+    if module is None:
+        raise ImportError("{} needs the {} package".format(feature, package))
+
+
+class JSONFormat:
+    """Writes the JSON text of the json module."""
+
+    name = 'json'
+    cached = True
+
+    def fragment(self, key, obj_dict):
+        """
+        Encode one member of the top-level object.
+
+        Args:
+            key (str): The storage key of the object.
+            obj_dict (dict): The dictionary of the object.
+
+        Returns:
+            bytes: The encoded key and dictionary.
+        """
+        return (json.dumps(key) + ': ' + json.dumps(obj_dict)).encode()
+
+    def join(self, fragments):
+        """
+        Assemble the encoded members into the whole file.
+
+        Args:
+            fragments (list): The results of fragment().
+
+        Returns:
+            bytes: The content of the file.
+        """
+        return b'{' + b', '.join(fragments) + b'}'
+
+    def loads(self, data):
+        """
+        Decode the content of a file, with orjson when it is installed.
+
+        Args:
+            data (bytes): The content of the file.
+
+        Returns:
+            dict: The dictionaries of the objects by key.
+        """
+        if orjson is not None:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(data)
+
+
+class ORJSONFormat(JSONFormat):
+    """Writes JSON with orjson, which is several times faster than the
+    json module. NaN and infinite floats are written as null."""
+
+    name = 'orjson'
+
+    def fragment(self, key, obj_dict):
+        """
+        Encode one member of the top-level object.
+
+        Args:
+            key (str): The storage key of the object.
+            obj_dict (dict): The dictionary of the object.
+
+        Returns:
+            bytes: The encoded key and dictionary.
+        """
+        return orjson.dumps(key) + b':' + orjson.dumps(obj_dict)
+
+    def join(self, fragments):
+        """
+        Assemble the encoded members into the whole file.
+
+        Args:
+            fragments (list): The results of fragment().
+
+        Returns:
+            bytes: The content of the file.
+        """
+        return b'{' + b','.join(fragments) + b'}'
+
+
+class MsgPackFormat:
+    """Writes a MessagePack map of the dictionaries by key."""
+
+    name = 'msgpack'
+    cached = True
+
+    def fragment(self, key, obj_dict):
+        """
+        Encode one entry of the map.
+
+        Args:
+            key (str): The storage key of the object.
+            obj_dict (dict): The dictionary of the object.
+
+        Returns:
+            bytes: The encoded key and dictionary.
+        """
+        return msgpack.packb(key) + msgpack.packb(obj_dict)
+
+    def join(self, fragments):
+        """
+        Assemble the encoded entries into the whole file, after the map
+        header holding their number.
+
+        Args:
+            fragments (list): The results of fragment().
+
+        Returns:
+            bytes: The content of the file.
+        """
+        count = len(fragments)
+        if count < 16:
+            header = bytes([0x80 | count])
+        elif count < 1 << 16:
+            header = b'\xde' + struct.pack('>H', count)
+        else:
+            header = b'\xdf' + struct.pack('>I', count)
+        return header + b''.join(fragments)
+
+    def loads(self, data):
+        """
+        Decode the content of a file.
+
+        Args:
+            data (bytes): The content of the file.
+
+        Returns:
+            dict: The dictionaries of the objects by key.
+        """
+        require(msgpack, 'msgpack', 'Reading a msgpack file')
+        return msgpack.unpackb(data, raw=False)
+
+
+class CompactFormat:
+    """Writes the objects grouped by class and by set of attributes, as
+    {class name: [[attribute names, [row of values, ...]], ...]}, after
+    COMPACT_MAGIC and a byte telling how the groups are encoded: M for
+    MessagePack and J for JSON. The storage keys are not written, as
+    they are made of the class name and the id."""
+
+    name = 'compact'
+    cached = False
+
+    def fragment(self, key, obj_dict):
+        """
+        Return an object unchanged, as the objects are only encoded
+        once grouped.
+
+        Args:
+            key (str): The storage key of the object.
+            obj_dict (dict): The dictionary of the object.
+
+        Returns:
+            dict: The dictionary.
+        """
+        return obj_dict
+
+    def join(self, fragments):
+        """
+        Group the dictionaries and encode the groups.
+
+        Args:
+            fragments (list): The dictionaries of the objects.
+
+        Returns:
+            bytes: The content of the file.
+        """
+        classes = {}
+        for obj_dict in fragments:
+            names = tuple(sorted(name for name in obj_dict
+                                 if name != '__class__'))
+            groups = classes.setdefault(obj_dict['__class__'], {})
+            groups.setdefault(names, []).append([obj_dict[name]
+                                                 for name in names])
+        body = {class_name: [[list(names), rows]
+                             for names, rows in groups.items()]
+                for class_name, groups in classes.items()}
+        if msgpack is not None:
+            return COMPACT_MAGIC + b'M' + msgpack.packb(body)
+        return COMPACT_MAGIC + b'J' + json.dumps(body).encode()
+
+    def loads(self, data):
+        """
+        Decode the content of a file.
+
+        Args:
+            data (bytes): The content of the file.
+
+        Returns:
+            dict: The dictionaries of the objects by key.
+        """
+        start = len(COMPACT_MAGIC) + 1
+        if data[start - 1:start] == b'M':
+            require(msgpack, 'msgpack', 'Reading this compact file')
+            body = msgpack.unpackb(data[start:], raw=False)
+        else:
+            body = JSONFormat().loads(data[start:])
+        obj_dicts = {}
+        for class_name, groups in body.items():
+            for names, rows in groups:
+                for row in rows:
+                    obj_dict = dict(zip(names, row))
+                    obj_dict['__class__'] = class_name
+                    obj_dicts[f"{class_name}.{obj_dict['id']}"] = obj_dict
+        return obj_dicts
+
+
+FORMATS = {fmt.name: fmt for fmt in (JSONFormat, ORJSONFormat,
+                                     MsgPackFormat, CompactFormat)}
+COMPRESSIONS = ('gzip', 'zstd')
+
+
+class Codec:
+    """Encodes files in one format with one compression."""
+
+    def __init__(self, format_name='json', compression=None):
+        """
+        Initialize a codec.
+
+        Args:
+            format_name (str): One of the names in FORMATS.
+            compression (Optional[str]): One of COMPRESSIONS, or None or
+            an empty string for no compression.
+
+        Raises:
+            ValueError: If the format or the compression is unknown.
+            ImportError: If they need a package which is not installed.
+        """
+        if format_name not in FORMATS:
+            raise ValueError("unknown file format: {}".format(format_name))
+        if compression and compression not in COMPRESSIONS:
+            raise ValueError("unknown compression: {}".format(compression))
+        if format_name == 'orjson':
+            require(orjson, 'orjson', 'The orjson format')
+        elif format_name == 'msgpack':
+            require(msgpack, 'msgpack', 'The msgpack format')
+        if compression == 'zstd':
+            require(zstandard, 'zstandard', 'zstd compression')
+        self.format = FORMATS[format_name]()
+        self.compression = compression or None
+        self.cached = self.format.cached
+
+    def fragment(self, key, obj_dict):
+        """
+        Encode one object, as FileStorage keeps when cached is true.
+
+        Args:
+            key (str): The storage key of the object.
+            obj_dict (dict): The dictionary of the object.
+
+        Returns:
+            The encoded object, to pass to encode().
+        """
+        return self.format.fragment(key, obj_dict)
+
+    def encode(self, fragments):
+        """
+        Build the content of a file from encoded objects.
+
+        Args:
+            fragments (list): The results of fragment().
+
+        Returns:
+            bytes: The content of the file, compressed if configured.
+        """
+        data = self.format.join(fragments)
+        if self.compression == 'gzip':
+            return gzip.compress(data, compresslevel=6)
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor().compress(data)
+        return data
+
+    def dumps(self, obj_dicts):
+        """
+        Build the content of a file from dictionaries.
+
+        Args:
+            obj_dicts (dict): The dictionaries of the objects by key.
+
+        Returns:
+            bytes: The content of the file.
+        """
+        return self.encode([self.fragment(key, obj_dict)
+                            for key, obj_dict in obj_dicts.items()])
+
+
+def loads(data):
+    """
+    Decode the content of a file in any format and compression.
+
+    Args:
+        data (bytes): The content of the file.
+
+    Returns:
+        dict: The dictionaries of the objects by key.
+    """
+    if data[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    elif data[:len(ZSTD_MAGIC)] == ZSTD_MAGIC:
+        require(zstandard, 'zstandard', 'Reading a zstd file')
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if data[:len(COMPACT_MAGIC)] == COMPACT_MAGIC:
+        return CompactFormat().loads(data)
+    if data[:1] and (0x80 <= data[0] <= 0x8f or data[0] in (0xde, 0xdf)):
+        return MsgPackFormat().loads(data)
+    return JSONFormat().loads(data)
+
+
+def load(path):
+    """
+    Read a file in any format and compression.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        dict: The dictionaries of the objects by key.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read())
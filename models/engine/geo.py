@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""Provides the great-circle distance and bounding box computations
+behind storage.places_near()."""
+import math
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def coordinates(obj):
+    """
+    Read the latitude and longitude set on an object.
+
+    Only the values of the object itself count: the 0.0 defaults of the
+    Place class in file storage stand for missing coordinates, as NULL
+    does in the database.
+
+    Args:
+        obj: The object, usually a Place.
+
+    Returns:
+        tuple: The (latitude, longitude) pair in degrees, or None if
+        either is missing or not a finite number.
+    """
+    attributes = getattr(obj, '__dict__', {})
+    point = []
+    for name in ('latitude', 'longitude'):
+        value = attributes.get(name)
+        if not isinstance(value, (int, float)) or isinstance(value, bool) \
+                or not math.isfinite(value):
+            return None
+        point.append(float(value))
+    return tuple(point)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Compute the great-circle distance between two points.
+
+    Args:
+        lat1 (float): The latitude of the first point, in degrees.
+        lon1 (float): The longitude of the first point, in degrees.
+        lat2 (float): The latitude of the second point, in degrees.
+        lon2 (float): The longitude of the second point, in degrees.
+
+    Returns:
+        float: The distance in kilometers.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    Compute the latitude and longitude ranges holding every point within
+    a distance of a center.
+
+    Args:
+        latitude (float): The latitude of the center, in degrees.
+        longitude (float): The longitude of the center, in degrees.
+        radius (float): The distance, in kilometers.
+
+    Returns:
+        tuple: The minimum and maximum latitudes, and a list of
+        (minimum, maximum) longitude ranges: two of them when the box
+        crosses the antimeridian.
+    """
+    angle = radius / EARTH_RADIUS_KM
+    min_lat = latitude - math.degrees(angle)
+    max_lat = latitude + math.degrees(angle)
+    if min_lat <= -90 or max_lat >= 90 or angle >= math.pi / 2:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+    delta_lon = math.degrees(math.asin(min(1.0, math.sin(angle) /
+                                           math.cos(math.radians(latitude)))))
+    min_lon = longitude - delta_lon
+    max_lon = longitude + delta_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
@@ -0,0 +1,834 @@
+#!/usr/bin/python3
+"""Provides the in-memory secondary indexes that FileStorage keeps
+up to date as objects are added, changed and deleted.
+
+Objects are indexed by class, so that all(cls) costs time proportional
+to the number of objects of that class, and by their foreign keys and
+Place.amenity_ids, so that the relationship getters of the models are
+dictionary lookups. Named objects are kept ordered by name for query(),
+places are bucketed into a latitude and longitude grid for
+places_near(), the words of descriptions and reviews are kept in an
+inverted index for search(), and each amenity has a bitset of its
+places for search_places().
+"""
+import math
+import re
+import sys
+from array import array
+from bisect import bisect_left, insort
+
+from models.engine.geo import bounding_box, coordinates, haversine
+
+TEXT_ATTRIBUTES = {'Place': 'description', 'Review': 'text'}
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """
+    Split a text into the words that storage.search() matches.
+
+    Args:
+        text: The text; values that are not strings have no words.
+
+    Returns:
+        set: The distinct words of the text, lowercased.
+    """
+    if not isinstance(text, str):
+        return set()
+    return set(WORD.findall(text.lower()))
+
+
+def listed_ids(value):
+    """
+    List the ids held by a list attribute, such as Place.amenity_ids.
+
+    Args:
+        value: The value of the attribute.
+
+    Returns:
+        set: The distinct ids in the list, or none if it is not a list.
+    """
+    if not isinstance(value, list):
+        return set()
+    return {item for item in value if isinstance(item, str) and item}
+
+
+def sort_key(value):
+    """
+    Build the key ordering attribute values the way Jinja's sort filter
+    and MySQL's default collations do: strings case-insensitively.
+
+    Args:
+        value: The attribute value.
+
+    Returns:
+        tuple: A key ordering missing values first, then strings, then
+        other values.
+    """
+    if value is None:
+        return (0, '')
+    if isinstance(value, str):
+        return (1, value.lower())
+    return (2, value)
+
+
+class ClassIndex:
+    """Groups the stored objects by their exact class."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.buckets = {}
+
+    def add(self, key, obj):
+        """
+        Index an object.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        self.buckets.setdefault(type(obj), {})[key] = obj
+
+    def add_many(self, items):
+        """
+        Index many objects.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        for key, obj in items:
+            self.add(key, obj)
+
+    def discard(self, key, obj):
+        """
+        Remove an object from the index if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+        """
+        bucket = self.buckets.get(type(obj))
+        if bucket is not None:
+            bucket.pop(key, None)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.buckets.clear()
+
+    def lookup(self, cls):
+        """
+        Collect the objects that are instances of a class.
+
+        Args:
+            cls (Type): The class to look up; subclasses are included.
+
+        Returns:
+            dict: A new dictionary of the matching objects by key.
+        """
+        cls_objects = {}
+        for clss, bucket in self.buckets.items():
+            if issubclass(clss, cls):
+                cls_objects.update(bucket)
+        return cls_objects
+
+    def count(self, cls):
+        """
+        Count the objects of exactly one class.
+
+        Args:
+            cls (Type): The class; subclasses are not included.
+
+        Returns:
+            int: The number of objects.
+        """
+        return len(self.buckets.get(cls, ()))
+
+
+class ForeignKeyIndex:
+    """Groups the stored objects by class and by the value of one of
+    their foreign key attributes, such as state_id."""
+
+    def __init__(self, attribute):
+        """
+        Initialize an empty index.
+
+        Args:
+            attribute (str): The name of the foreign key attribute.
+        """
+        self.attribute = attribute
+        self.refs = {}
+
+    def add(self, key, obj):
+        """
+        Index an object under the current value of its foreign key.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        for value in self.values(getattr(obj, self.attribute, None)):
+            self.refs.setdefault((type(obj), value), {})[key] = obj
+
+    def add_many(self, items):
+        """
+        Index many objects.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        for key, obj in items:
+            self.add(key, obj)
+
+    def discard(self, key, obj, value=None):
+        """
+        Remove an object from the index if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+            value: The foreign key value the object was indexed under,
+            when it is no longer the current one.
+        """
+        if value is None:
+            value = getattr(obj, self.attribute, None)
+        for value in self.values(value):
+            bucket = self.refs.get((type(obj), value))
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self.refs[(type(obj), value)]
+
+    def values(self, value):
+        """
+        List the ids an attribute value refers to.
+
+        Args:
+            value: The value of the foreign key attribute.
+
+        Returns:
+            tuple: The referenced id, or nothing if the value is empty or
+            not an id.
+        """
+        if isinstance(value, str) and value:
+            return (value,)
+        return ()
+
+    def move(self, key, obj, old):
+        """
+        Re-index an object whose foreign key has changed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The changed object.
+            old: The previous foreign key value.
+        """
+        self.discard(key, obj, old)
+        self.add(key, obj)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.refs.clear()
+
+    def lookup(self, cls, value):
+        """
+        Collect the objects of a class referring to a given id.
+
+        Args:
+            cls (Type): The exact class of the objects to look up.
+            value (str): The foreign key value to match.
+
+        Returns:
+            list: The matching objects.
+        """
+        return list(self.refs.get((cls, value), {}).values())
+
+
+class ForeignKeyListIndex(ForeignKeyIndex):
+    """Groups the stored objects by class and by each of the ids listed
+    in one of their attributes, such as Place.amenity_ids, mirroring an
+    association table."""
+
+    def values(self, value):
+        """
+        List the ids an attribute value refers to.
+
+        Args:
+            value: The list of ids held by the attribute.
+
+        Returns:
+            set: The distinct ids in the list.
+        """
+        return listed_ids(value)
+
+
+class SortedIndex:
+    """Keeps the objects of some classes ordered by an attribute."""
+
+    def __init__(self, attribute, class_names):
+        """
+        Initialize an empty index.
+
+        Args:
+            attribute (str): The name of the attribute to order by.
+            class_names (Iterable[str]): The names of the classes whose
+            objects are kept ordered.
+        """
+        self.attribute = attribute
+        self.class_names = set(class_names)
+        self.entries = {}
+        self.positions = {}
+        self.objects = {}
+
+    def covers(self, cls, attribute):
+        """
+        Tell whether the index can order the objects of a class.
+
+        Args:
+            cls (Type): The class of the objects.
+            attribute (str): The attribute to order by.
+
+        Returns:
+            bool: True if the index keeps cls ordered by attribute.
+        """
+        return attribute == self.attribute and \
+            cls.__name__ in self.class_names
+
+    def add(self, key, obj):
+        """
+        Index an object under the current value of the attribute.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        if type(obj).__name__ not in self.class_names:
+            return
+        self.discard(key, obj)
+        entry = (sort_key(getattr(obj, self.attribute, None)), key)
+        insort(self.entries.setdefault(type(obj), []), entry)
+        self.positions[key] = entry
+        self.objects[key] = obj
+
+    def add_many(self, items):
+        """
+        Index many objects, sorting once instead of inserting each
+        object in place.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        items = [(key, obj) for key, obj in items
+                 if type(obj).__name__ in self.class_names]
+        for key, obj in items:
+            self.discard(key, obj)
+        touched = set()
+        for key, obj in items:
+            entry = (sort_key(getattr(obj, self.attribute, None)), key)
+            self.entries.setdefault(type(obj), []).append(entry)
+            self.positions[key] = entry
+            self.objects[key] = obj
+            touched.add(type(obj))
+        for cls in touched:
+            self.entries[cls].sort()
+
+    def discard(self, key, obj, value=None):
+        """
+        Remove an object from the index if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+            value: Unused, as the index remembers where each object is.
+        """
+        entry = self.positions.pop(key, None)
+        if entry is None:
+            return
+        del self.objects[key]
+        entries = self.entries[type(obj)]
+        del entries[bisect_left(entries, entry)]
+
+    def move(self, key, obj, old):
+        """
+        Re-index an object whose attribute has changed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The changed object.
+            old: The previous value of the attribute.
+        """
+        self.add(key, obj)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.entries.clear()
+        self.positions.clear()
+        self.objects.clear()
+
+    def ordered(self, cls, reverse=False):
+        """
+        Iterate over the objects of a class in order.
+
+        Args:
+            cls (Type): The exact class of the objects.
+            reverse (bool): Iterate in descending order.
+
+        Yields:
+            BaseModel: The objects of cls, in order.
+        """
+        entries = self.entries.get(cls, [])
+        for entry in (entries[::-1] if reverse else entries[:]):
+            yield self.objects[entry[1]]
+
+
+class GridIndex:
+    """Buckets the objects of some classes into the cells of a grid of
+    latitudes and longitudes, so that the objects near a point are found
+    by examining the few cells around it."""
+
+    def __init__(self, class_names, cell_size=0.1):
+        """
+        Initialize an empty index.
+
+        Args:
+            class_names (Iterable[str]): The names of the classes whose
+            objects are indexed by their latitude and longitude.
+            cell_size (float): The side of a cell, in degrees.
+        """
+        self.class_names = set(class_names)
+        self.cell_size = cell_size
+        self.rows = math.ceil(180 / cell_size)
+        self.columns = math.ceil(360 / cell_size)
+        self.cells = {}
+        self.positions = {}
+
+    def row(self, latitude):
+        """
+        Return the row of the cells holding a latitude.
+
+        Args:
+            latitude (float): The latitude, in degrees.
+
+        Returns:
+            int: The row number.
+        """
+        return min(max(int((latitude + 90) // self.cell_size), 0),
+                   self.rows - 1)
+
+    def column(self, longitude):
+        """
+        Return the column of the cells holding a longitude.
+
+        Args:
+            longitude (float): The longitude, in degrees.
+
+        Returns:
+            int: The column number.
+        """
+        return int((longitude + 180) // self.cell_size) % self.columns
+
+    def add(self, key, obj):
+        """
+        Index an object under its current latitude and longitude; objects
+        without both are not indexed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        if type(obj).__name__ not in self.class_names:
+            return
+        self.discard(key, obj)
+        point = coordinates(obj)
+        if point is None:
+            return
+        cell = (self.row(point[0]), self.column(point[1]))
+        self.cells.setdefault(cell, {})[key] = obj
+        self.positions[key] = cell
+
+    def add_many(self, items):
+        """
+        Index many objects.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        for key, obj in items:
+            self.add(key, obj)
+
+    def discard(self, key, obj, value=None):
+        """
+        Remove an object from the index if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+            value: Unused, as the index remembers where each object is.
+        """
+        cell = self.positions.pop(key, None)
+        if cell is None:
+            return
+        bucket = self.cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, key, obj, old):
+        """
+        Re-index an object whose latitude or longitude has changed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The changed object.
+            old: The previous value of the attribute.
+        """
+        self.add(key, obj)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.cells.clear()
+        self.positions.clear()
+
+    def near(self, cls, latitude, longitude, radius):
+        """
+        Find the objects of a class within a distance of a point.
+
+        Args:
+            cls (Type): The exact class of the objects.
+            latitude (float): The latitude of the point, in degrees.
+            longitude (float): The longitude of the point, in degrees.
+            radius (float): The distance, in kilometers.
+
+        Returns:
+            list: The (distance, object) pairs of the matching objects,
+            nearest first.
+        """
+        min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude,
+                                                    radius)
+        rows = range(self.row(min_lat), self.row(max_lat) + 1)
+        columns = set()
+        for low, high in lon_ranges:
+            last = min(int((high + 180) // self.cell_size), self.columns - 1)
+            columns.update(range(self.column(low), last + 1))
+        if len(rows) * len(columns) > len(self.cells):
+            cells = [cell for cell in self.cells
+                     if cell[0] in rows and cell[1] in columns]
+        else:
+            cells = [(row, column) for row in rows for column in columns]
+        found = []
+        for cell in cells:
+            for obj in self.cells.get(cell, {}).values():
+                point = coordinates(obj)
+                if type(obj) is not cls or point is None:
+                    continue
+                distance = haversine(latitude, longitude, *point)
+                if distance <= radius:
+                    found.append((distance, obj))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class TextIndex:
+    """Maps each word of a text attribute of the stored objects, such as
+    Review.text, to the objects whose text contains it."""
+
+    def __init__(self, attributes):
+        """
+        Initialize an empty index.
+
+        Args:
+            attributes (dict): The name of the text attribute indexed for
+            each class name.
+        """
+        self.attributes = dict(attributes)
+        self.postings = {}
+        self.words = {}
+
+    def add(self, key, obj):
+        """
+        Index an object under the words of its text.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        attribute = self.attributes.get(type(obj).__name__)
+        if attribute is None:
+            return
+        self.discard(key, obj)
+        words = tokenize(getattr(obj, attribute, None))
+        for word in words:
+            self.postings.setdefault((type(obj), word), {})[key] = obj
+        if words:
+            self.words[key] = words
+
+    def add_many(self, items):
+        """
+        Index many objects.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        for key, obj in items:
+            self.add(key, obj)
+
+    def discard(self, key, obj, value=None):
+        """
+        Remove an object from the index if it is present.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+            value: Unused, as the index remembers the words of each object.
+        """
+        for word in self.words.pop(key, ()):
+            bucket = self.postings[(type(obj), word)]
+            del bucket[key]
+            if not bucket:
+                del self.postings[(type(obj), word)]
+
+    def move(self, key, obj, old):
+        """
+        Re-index an object whose text has changed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The changed object.
+            old: The previous text.
+        """
+        self.add(key, obj)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.postings.clear()
+        self.words.clear()
+
+    def search(self, cls, text):
+        """
+        Find the objects of a class whose text contains every word of a
+        query.
+
+        Args:
+            cls (Type): The exact class of the objects.
+            text (str): The query.
+
+        Returns:
+            list: The matching objects, in no particular order; none if
+            the query has no words.
+        """
+        buckets = [self.postings.get((cls, word), {})
+                   for word in tokenize(text)]
+        if not buckets:
+            return []
+        buckets.sort(key=len)
+        keys = buckets[0].keys()
+        for bucket in buckets[1:]:
+            keys = keys & bucket.keys()
+        return [buckets[0][key] for key in keys]
+
+
+class BitsetIndex:
+    """Numbers the objects of one class and keeps, for each id listed in
+    one of their attributes, the objects listing it as the bits of an
+    integer, so that filters combine with bitwise operations. A bit is
+    set for every object holding the id, such as every place with a
+    given amenity."""
+
+    def __init__(self, class_name, attribute):
+        """
+        Initialize an empty index.
+
+        Args:
+            class_name (str): The name of the class of the objects.
+            attribute (str): The name of the attribute listing ids.
+        """
+        self.class_name = class_name
+        self.attribute = attribute
+        self.ordinals = {}
+        self.objects = []
+        self.free = []
+        self.bits = {}
+        self.ids = {}
+
+    def ordinal(self, key, obj):
+        """
+        Return the bit number of an object, numbering it if it is new.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object.
+
+        Returns:
+            int: The bit number.
+        """
+        ordinal = self.ordinals.get(key)
+        if ordinal is None:
+            if self.free:
+                ordinal = self.free.pop()
+            else:
+                ordinal = len(self.objects)
+                self.objects.append(None)
+            self.ordinals[key] = ordinal
+        self.objects[ordinal] = obj
+        return ordinal
+
+    def add(self, key, obj):
+        """
+        Index an object under the ids its attribute lists.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to index.
+        """
+        self.add_many([(key, obj)])
+
+    def add_many(self, items):
+        """
+        Index many objects, building each bitset once.
+
+        Args:
+            items (Iterable[tuple]): The (key, object) pairs to index.
+        """
+        members = {}
+        for key, obj in items:
+            if type(obj).__name__ != self.class_name:
+                continue
+            self.discard(key, obj)
+            ordinal = self.ordinal(key, obj)
+            ids = listed_ids(getattr(obj, self.attribute, None))
+            for value in ids:
+                members.setdefault(value, []).append(ordinal)
+            self.ids[key] = ids
+        for value, ordinals in members.items():
+            self.bits[value] = self.bits.get(value, 0) | \
+                self.from_ordinals(ordinals)
+
+    def discard(self, key, obj, value=None):
+        """
+        Remove an object from the index if it is present, freeing its
+        bit number for reuse.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The object to remove.
+            value: Unused, as the index remembers the ids of each object.
+        """
+        ordinal = self.ordinals.pop(key, None)
+        if ordinal is None:
+            return
+        mask = ~(1 << ordinal)
+        for value in self.ids.pop(key, ()):
+            bits = self.bits[value] & mask
+            if bits:
+                self.bits[value] = bits
+            else:
+                del self.bits[value]
+        self.objects[ordinal] = None
+        self.free.append(ordinal)
+
+    def move(self, key, obj, old):
+        """
+        Re-index an object whose attribute has changed.
+
+        Args:
+            key (str): The storage key of the object.
+            obj (BaseModel): The changed object.
+            old: The previous value of the attribute.
+        """
+        self.add(key, obj)
+
+    def clear(self):
+        """Remove every object from the index."""
+        self.ordinals.clear()
+        self.objects.clear()
+        self.free.clear()
+        self.bits.clear()
+        self.ids.clear()
+
+    def from_ordinals(self, ordinals):
+        """
+        Build the bitset of some bit numbers.
+
+        Args:
+            ordinals (Iterable[int]): The bit numbers.
+
+        Returns:
+            int: The bitset.
+        """
+        data = bytearray((len(self.objects) + 7) // 8)
+        for ordinal in ordinals:
+            data[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(data, 'little')
+
+    def from_keys(self, keys):
+        """
+        Build the bitset of some indexed objects.
+
+        Args:
+            keys (Iterable[str]): The storage keys of the objects; the
+            ones not indexed are skipped.
+
+        Returns:
+            int: The bitset.
+        """
+        ordinals = self.ordinals
+        return self.from_ordinals(ordinals[key] for key in keys
+                                  if key in ordinals)
+
+    def everything(self):
+        """
+        Return the bitset of every indexed object.
+
+        Returns:
+            int: The bitset.
+        """
+        return self.from_ordinals(self.ordinals.values())
+
+    def members(self, bits):
+        """
+        List the objects of a bitset.
+
+        Args:
+            bits (int): The bitset.
+
+        Returns:
+            list: The objects whose bits are set.
+        """
+        words = (bits.bit_length() + 63) // 64
+        found = []
+        data = array('Q', bits.to_bytes(words * 8, 'little'))
+        if sys.byteorder == 'big':
+            data.byteswap()
+        for number, word in enumerate(data):
+            base = number << 6
+            while word:
+                low = word & -word
+                found.append(self.objects[base + low.bit_length() - 1])
+                word ^= low
+        return found
+
+    def having(self, ids, match_all=True):
+        """
+        Build the bitset of the objects listing some ids.
+
+        Args:
+            ids (Iterable[str]): The ids.
+            match_all (bool): Select the objects listing every id rather
+            than any of them.
+
+        Returns:
+            int: The bitset.
+        """
+        ids = list(ids)
+        if not ids:
+            return self.everything() if match_all else 0
+        bitsets = sorted((self.bits.get(value, 0) for value in ids),
+                         key=int.bit_length)
+        bits = bitsets[0]
+        for other in bitsets[1:]:
+            if match_all:
+                if not bits:
+                    break
+                bits &= other
+            else:
+                bits |= other
+        return bits
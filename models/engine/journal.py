@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""Provides the append-only write-ahead log used by FileStorage's
+journal mode.
+
+Every write is appended to the log as one compact JSON record per line:
+`["put", key, obj_dict]` stores an object and `["del", key]` removes it.
+The log is periodically folded into the snapshot by `compact`, which
+keeps the snapshot in the format FileStorage is configured with.
+"""
+import json
+import os
+
+from models.engine import formats
+
+
+def append(log_path, records):
+    """
+    Append records to the end of a log file.
+
+    Args:
+        log_path (str): Path of the log file.
+        records (list): Records to append, in order.
+    """
+    if not records:
+        return
+    lines = [json.dumps(record, separators=(',', ':')) for record in records]
+    with open(log_path, 'a') as log_file:
+        log_file.write('\n'.join(lines) + '\n')
+
+
+def replay(log_path, obj_dicts):
+    """
+    Apply every record of a log file to a dictionary of object dicts.
+
+    A truncated trailing line, left behind by an interrupted write,
+    is ignored.
+
+    Args:
+        log_path (str): Path of the log file.
+        obj_dicts (dict): Mapping of object keys to their dictionaries,
+        updated in place.
+
+    Returns:
+        int: The number of records applied.
+    """
+    count = 0
+    try:
+        with open(log_path, 'r') as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record[0] == 'put':
+                    obj_dicts[record[1]] = record[2]
+                else:
+                    obj_dicts.pop(record[1], None)
+                count += 1
+    except FileNotFoundError:
+        pass
+    return count
+
+
+def compact(snapshot_path, sealed_path, codec=None):
+    """
+    Fold a sealed log segment into the snapshot.
+
+    The new snapshot is written to a temporary file and renamed over
+    the old one, so a crash leaves either snapshot in place together
+    with the segment, and replaying the segment again is harmless.
+
+    Args:
+        snapshot_path (str): Path of the snapshot file.
+        sealed_path (str): Path of the log segment to fold in.
+        codec (Optional[formats.Codec]): How to write the snapshot, JSON
+        by default.
+    """
+    try:
+        obj_dicts = formats.load(snapshot_path)
+    except FileNotFoundError:
+        obj_dicts = {}
+    replay(sealed_path, obj_dicts)
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write((codec or formats.Codec()).dumps(obj_dicts))
+    os.replace(tmp_path, snapshot_path)
+    os.remove(sealed_path)
+
+
+def discard(*paths):
+    """
+    Remove log files that are superseded by a full snapshot.
+
+    Args:
+        *paths (str): Paths of the files to remove; missing ones are
+        skipped.
+    """
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+"""Provides the file layout of FileStorage's sharded mode.
+
+Each class is stored in its own file next to the single file, as
+file.State.json for file.json. The classes in HASHED can be spread over
+several files, file.Review.0.json to file.Review.7.json with 8 shards,
+by a hash of the ids. The functions here locate the file of an object
+and convert between the single file and the sharded layout. The files
+are written with a formats.Codec and read in whatever format they hold.
+"""
+import glob
+import os
+import re
+import zlib
+
+from models.engine import formats, journal
+
+HASHED = ('Place', 'Review')
+
+
+def shard_count(class_name, shards):
+    """
+    Return the number of files the objects of a class are spread over.
+
+    Args:
+        class_name (str): The name of the class.
+        shards (int): The number of files of the classes in HASHED.
+
+    Returns:
+        int: shards for the classes in HASHED, and 1 for the others.
+    """
+    return max(shards, 1) if class_name in HASHED else 1
+
+
+def shard_path(file_path, class_name, number=None):
+    """
+    Build the path of a file of a class.
+
+    Args:
+        file_path (str): The path of the single file.
+        class_name (str): The name of the class.
+        number (Optional[int]): The number of the shard, for a class
+        spread over several files.
+
+    Returns:
+        str: The path.
+    """
+    root, ext = os.path.splitext(file_path)
+    if number is None:
+        return f"{root}.{class_name}{ext}"
+    return f"{root}.{class_name}.{number:d}{ext}"
+
+
+def shard_paths(file_path, class_name, shards):
+    """
+    List the paths of the files of a class.
+
+    Args:
+        file_path (str): The path of the single file.
+        class_name (str): The name of the class.
+        shards (int): The number of files of the classes in HASHED.
+
+    Returns:
+        list: The paths, one per shard.
+    """
+    count = shard_count(class_name, shards)
+    if count == 1:
+        return [shard_path(file_path, class_name)]
+    return [shard_path(file_path, class_name, number)
+            for number in range(count)]
+
+
+def locate(file_path, key, shards):
+    """
+    Return the path of the file holding an object.
+
+    The shard is chosen by the CRC-32 of the id, which unlike hash() is
+    the same in every process.
+
+    Args:
+        file_path (str): The path of the single file.
+        key (str): The storage key of the object.
+        shards (int): The number of files of the classes in HASHED.
+
+    Returns:
+        str: The path.
+    """
+    class_name, _, obj_id = key.partition('.')
+    count = shard_count(class_name, shards)
+    if count == 1:
+        return shard_path(file_path, class_name)
+    return shard_path(file_path, class_name,
+                      zlib.crc32(obj_id.encode()) % count)
+
+
+def existing_paths(file_path, class_name):
+    """
+    List the files of a class found on disk, whatever the number of
+    shards they were written with.
+
+    Args:
+        file_path (str): The path of the single file.
+        class_name (str): The name of the class.
+
+    Returns:
+        list: The paths, sorted.
+    """
+    root, ext = os.path.splitext(file_path)
+    prefix = f"{root}.{class_name}"
+    pattern = re.compile(re.escape(prefix) + r'(\.\d+)?' + re.escape(ext) +
+                         '$')
+    return sorted(path for path in glob.glob(glob.escape(prefix) + '*' + ext)
+                  if pattern.match(path))
+
+
+def signature(path):
+    """
+    Describe the current version of a file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        tuple: The inode, modification time and size of the file, or
+        None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def read(path):
+    """
+    Read the dictionaries of a file, in any format.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        dict: The dictionaries by key, empty if the file does not exist.
+    """
+    try:
+        return formats.load(path)
+    except FileNotFoundError:
+        return {}
+
+
+def write(path, data):
+    """
+    Replace the content of a file, through a temporary file renamed over
+    it so that readers never see it half written.
+
+    Args:
+        path (str): The path of the file.
+        data (bytes): The new content.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def remove(paths):
+    """
+    Remove files, skipping the missing ones.
+
+    Args:
+        paths (Iterable[str]): The paths of the files.
+    """
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def split(file_path, obj_dicts, shards, codec=None):
+    """
+    Write dictionaries to the files of their classes.
+
+    Args:
+        file_path (str): The path of the single file.
+        obj_dicts (dict): The dictionaries by key.
+        shards (int): The number of files of the classes in HASHED.
+        codec (Optional[formats.Codec]): How to write the files, JSON by
+        default.
+
+    Returns:
+        set: The paths of the files written.
+    """
+    codec = codec or formats.Codec()
+    by_path = {}
+    for key, obj_dict in obj_dicts.items():
+        by_path.setdefault(locate(file_path, key, shards), {})[key] = obj_dict
+    for path, shard in by_path.items():
+        write(path, codec.dumps(shard))
+    return set(by_path)
+
+
+def migrate(file_path, class_names, shards, codec=None):
+    """
+    Convert the files of a storage to the sharded layout.
+
+    When no class file exists yet, the single file, with its write-ahead
+    logs replayed, is split into class files and removed. A class whose
+    files were written with another number of shards is split again:
+    the files of the classes in HASHED are read to check that each
+    object is in the file locate() gives, since with more shards the
+    old files are still among the expected ones.
+
+    Args:
+        file_path (str): The path of the single file.
+        class_names (Iterable[str]): The names of the stored classes.
+        shards (int): The number of files of the classes in HASHED.
+        codec (Optional[formats.Codec]): How to write the files, JSON by
+        default.
+    """
+    log_path = file_path + '.log'
+    found = {name: existing_paths(file_path, name) for name in class_names}
+    if not any(found.values()):
+        sources = [path for path in (file_path, log_path + '.1', log_path)
+                   if os.path.exists(path)]
+        if sources:
+            obj_dicts = read(file_path)
+            journal.replay(log_path + '.1', obj_dicts)
+            journal.replay(log_path, obj_dicts)
+            split(file_path, obj_dicts, shards, codec)
+            journal.discard(*sources)
+        return
+    for name, paths in found.items():
+        expected = shard_paths(file_path, name, shards)
+        if not paths or (len(expected) == 1 and paths == expected):
+            continue
+        obj_dicts = {}
+        misplaced = not set(paths) <= set(expected)
+        for path in paths:
+            shard = read(path)
+            misplaced = misplaced or any(
+                locate(file_path, key, shards) != path for key in shard)
+            obj_dicts.update(shard)
+        if misplaced:
+            remove(set(paths) - split(file_path, obj_dicts, shards, codec))
+
+
+def merge(file_path, class_names, codec=None):
+    """
+    Convert the files of a storage back to the single file, when the
+    single file does not exist and class files do.
+
+    Args:
+        file_path (str): The path of the single file.
+        class_names (Iterable[str]): The names of the stored classes.
+        codec (Optional[formats.Codec]): How to write the file, JSON by
+        default.
+    """
+    if os.path.exists(file_path):
+        return
+    paths = [path for name in class_names
+             for path in existing_paths(file_path, name)]
+    if not paths:
+        return
+    obj_dicts = {}
+    for path in paths:
+        obj_dicts.update(read(path))
+    write(file_path, (codec or formats.Codec()).dumps(obj_dicts))
+    remove(paths)
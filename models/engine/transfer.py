@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+"""Streams the stored objects to and from JSON Lines files, one object
+per line, so that data can be moved between FileStorage and DBStorage
+without holding a second copy of it in memory.
+
+The links between places and amenities travel as the amenity_ids of
+each Place, whichever storage they come from or go to.
+"""
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import inspect
+
+from models.engine.file_storage import get_class_name_to_class
+
+ORDER = ('BaseModel', 'State', 'City', 'User', 'Amenity', 'Place',
+         'Review')
+
+
+def to_record(obj):
+    """
+    Serialize an object to the dictionary written on its line.
+
+    Args:
+        obj (BaseModel): The object.
+
+    Returns:
+        dict: The to_dict() of the object without the relationships a
+        DBStorage object may have loaded, and with the amenity_ids of a
+        Place.
+    """
+    record = obj.to_dict()
+    mapper = inspect(type(obj), raiseerr=False)
+    if mapper is not None:
+        for name in mapper.relationships.keys():
+            record.pop(name, None)
+    if record['__class__'] == 'Place':
+        record['amenity_ids'] = [amenity.id for amenity in obj.amenities]
+    return record
+
+
+def export_objects(storage, out, cls=None, batch_size=1000):
+    """
+    Write the stored objects to a file, one JSON object per line.
+
+    The classes are written in an order where the objects an object
+    refers to come before it, so that the file can be imported into a
+    database with foreign key constraints.
+
+    Args:
+        storage: The storage to read the objects from.
+        out: The text file to write to.
+        cls (Optional[str]): The name of the only class to export.
+        batch_size (int): The number of objects fetched at a time.
+
+    Returns:
+        int: The number of objects written.
+    """
+    count = 0
+    for name in ORDER:
+        if cls is not None and name != cls:
+            continue
+        eager = ['amenities'] if name == 'Place' else None
+        for obj in storage.stream(name, batch_size, eager=eager):
+            if type(obj).__name__ != name:
+                continue
+            out.write(json.dumps(to_record(obj)) + '\n')
+            count += 1
+    return count
+
+
+def import_objects(storage, lines, batch_size=1000):
+    """
+    Store the objects read from lines of JSON objects, keeping their ids
+    and dates.
+
+    The lines are read batch_size at a time and handed to
+    storage.new_records(), one class after another, inside
+    storage.batch(), so that FileStorage writes its file once and
+    DBStorage commits once. If a line is invalid or the objects cannot
+    be stored, nothing is imported.
+
+    Objects of classes the storage cannot hold, such as BaseModel in a
+    database, are skipped. An object with the id of a stored one
+    replaces it in a file, and makes the import fail in a database.
+
+    Args:
+        storage: The storage to add the objects to.
+        lines (Iterable[str]): The lines, as read from a file; blank
+        lines are ignored.
+        batch_size (int): The number of lines read at a time.
+
+    Returns:
+        tuple: The number of objects imported and of objects skipped.
+
+    Raises:
+        ValueError: If a line is not a JSON object of a known class.
+    """
+    classes = get_class_name_to_class()
+    count = skipped = 0
+
+    def store(chunk):
+        """Store the records of a chunk, a run of one class at a time,
+        and return the number of them stored."""
+        stored = 0
+        for name, group in groupby(chunk, itemgetter('__class__')):
+            stored += storage.new_records(name, list(group))
+        return stored
+
+    with storage.batch():
+        chunk = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                name = record['__class__']
+            except (ValueError, TypeError, KeyError) as error:
+                raise ValueError("line {:d}: {}".format(number, error))
+            if name not in classes:
+                raise ValueError("line {:d}: unknown class {}"
+                                 .format(number, name))
+            chunk.append(record)
+            if len(chunk) >= batch_size:
+                stored = store(chunk)
+                count += stored
+                skipped += len(chunk) - stored
+                chunk = []
+        stored = store(chunk)
+        count += stored
+        skipped += len(chunk) - stored
+        storage.save()
+    return count, skipped
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """Defines the Place class as a subclass of BaseModel."""
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
+from sqlalchemy import (Column, String, Integer, Float, ForeignKey, Index,
+                        Table)
 from sqlalchemy.orm import relationship
 
 import models
@@ -21,20 +22,134 @@ if models.storage_type == 'db':
                                  primary_key=True))
 
 
+class AmenityIds(list):
+    """The ids of the amenities linked to a place in file storage.
+
+    It is a list without duplicates, as the place_amenity table of the
+    database: ids already present are skipped, and membership is checked
+    on a set kept next to the list. It tells the storage when it is
+    changed in place, as by append() or remove(), so that the indexes of
+    the links follow and the place is saved again, as when amenity_ids
+    is assigned.
+    """
+
+    def __init__(self, place, amenity_ids=()):
+        """
+        Initialize the list.
+
+        Args:
+            place (Place): The place holding the list.
+            amenity_ids (Iterable[str]): The ids of the amenities,
+            duplicates skipped.
+        """
+        super().__init__(dict.fromkeys(amenity_ids))
+        self.place = place
+        self.ids = set(self)
+
+    def __contains__(self, amenity_id):
+        """Tell whether an id is in the list, in constant time."""
+        return amenity_id in self.ids
+
+    def __report(self, old):
+        """Tell the storage that the list changed from old."""
+        models.storage.changed(self.place, 'amenity_ids', old)
+
+    def __replace(self, amenity_ids):
+        """Replace the content of the list, skipping duplicates."""
+        old = list(self)
+        amenity_ids = list(dict.fromkeys(amenity_ids))
+        if amenity_ids != old:
+            list.__setitem__(self, slice(None), amenity_ids)
+            self.ids = set(amenity_ids)
+            self.__report(old)
+
+    def append(self, amenity_id):
+        """Add an id at the end, unless it is already present."""
+        self.insert(len(self), amenity_id)
+
+    def insert(self, index, amenity_id):
+        """Add an id before an index, unless it is already present."""
+        if amenity_id in self.ids:
+            return
+        old = list(self)
+        list.insert(self, index, amenity_id)
+        self.ids.add(amenity_id)
+        self.__report(old)
+
+    def extend(self, amenity_ids):
+        """Add ids at the end, skipping the ones already present."""
+        self.__replace(list(self) + list(amenity_ids))
+
+    def remove(self, amenity_id):
+        """Remove an id, raising ValueError if it is not present."""
+        old = list(self)
+        list.remove(self, amenity_id)
+        self.ids.discard(amenity_id)
+        self.__report(old)
+
+    def pop(self, index=-1):
+        """Remove and return the id at an index, the last by default."""
+        old = list(self)
+        amenity_id = list.pop(self, index)
+        self.ids.discard(amenity_id)
+        self.__report(old)
+        return amenity_id
+
+    def clear(self):
+        """Remove every id."""
+        self.__replace(())
+
+    def sort(self, *, key=None, reverse=False):
+        """Sort the ids in place."""
+        old = list(self)
+        list.sort(self, key=key, reverse=reverse)
+        self.__report(old)
+
+    def reverse(self):
+        """Reverse the ids in place."""
+        old = list(self)
+        list.reverse(self)
+        self.__report(old)
+
+    def __setitem__(self, index, value):
+        """Replace the ids at an index or a slice, skipping duplicates."""
+        amenity_ids = list(self)
+        amenity_ids[index] = value
+        self.__replace(amenity_ids)
+
+    def __delitem__(self, index):
+        """Remove the ids at an index or a slice."""
+        amenity_ids = list(self)
+        del amenity_ids[index]
+        self.__replace(amenity_ids)
+
+    def __iadd__(self, amenity_ids):
+        """Add ids at the end, skipping the ones already present."""
+        self.extend(amenity_ids)
+        return self
+
+    def __imul__(self, count):
+        """Repeat the ids, which only empties the list for count < 1."""
+        self.__replace(list(self) * count)
+        return self
+
+
 class Place(BaseModel, Base):
     """Represents a place entity."""
 
     if models.storage_type == 'db':
         __tablename__ = 'places'
+        __table_args__ = (Index('ft_places_description', 'description',
+                                mysql_prefix='FULLTEXT'),)
         city_id = Column(String(60), ForeignKey('cities.id'), nullable=False)
         user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
-        name = Column(String(128), nullable=False)
+        name = Column(String(128), nullable=False, index=True)
         description = Column(String(1024), nullable=True)
         number_rooms = Column(Integer, nullable=False, default=0)
         number_bathrooms = Column(Integer, nullable=False, default=0)
         max_guest = Column(Integer, nullable=False, default=0)
         price_by_night = Column(Integer, nullable=False, default=0)
-        latitude = Column(Float, nullable=True)
+        latitude = Column(Float, nullable=True, index=True)
         longitude = Column(Float, nullable=True)
         reviews = relationship("Review", backref="place")
         amenities = relationship("Amenity",
@@ -57,21 +172,80 @@ class Place(BaseModel, Base):
         @property
         def reviews(self):
             """Getter for the reviews attribute."""
-            review_list = []
-            for review in models.storage.all("Review").values():
-                if review.place_id == self.id:
-                    review_list.append(review)
-            return review_list
+            return models.storage.related("Review", "place_id", self.id)
+
+        @property
+        def user(self):
+            """Getter for the User owning the place."""
+            return models.storage.get("User", self.user_id)
 
         @property
         def amenities(self):
             """Getter for the amenities attribute."""
             amenity_list = []
-            for amenity in models.storage.all("Amenity").values():
-                if amenity.id in self.amenity_ids:
+            for amenity_id in self.amenity_ids:
+                amenity = models.storage.get("Amenity", amenity_id)
+                if amenity is not None:
                     amenity_list.append(amenity)
             return amenity_list
 
+        @amenities.setter
+        def amenities(self, amenity):
+            """Setter linking one more Amenity to the place."""
+            self.link_amenities([amenity])
+
+        def link_amenities(self, amenities):
+            """
+            Link many Amenity instances to the place at once, skipping
+            the ones already linked.
+
+            Args:
+                amenities (Iterable[Amenity]): The amenities to link.
+            """
+            from models.amenity import Amenity
+
+            self.amenity_ids = list(self.amenity_ids) + [
+                amenity.id for amenity in amenities
+                if isinstance(amenity, Amenity)]
+
+        def unlink_amenities(self, amenities):
+            """
+            Unlink many Amenity instances from the place at once.
+
+            Args:
+                amenities (Iterable[Amenity]): The amenities to unlink.
+            """
+            unlinked = {amenity.id for amenity in amenities}
+            self.amenity_ids = [amenity_id for amenity_id in self.amenity_ids
+                                if amenity_id not in unlinked]
+
+        def __setattr__(self, name, value):
+            """
+            Set an attribute, keeping amenity_ids an AmenityIds list.
+
+            Args:
+                name (str): The name of the attribute.
+                value: The new value of the attribute.
+            """
+            if name == 'amenity_ids' and isinstance(value, (list, tuple)) \
+                    and not (isinstance(value, AmenityIds) and
+                             value.place is self):
+                value = AmenityIds(self, value)
+            super().__setattr__(name, value)
+
+        def to_dict(self):
+            """returns a dictionary containing all keys/values of the
+            instance, with amenity_ids as a plain list of its own"""
+            new_dict = super().to_dict()
+            if isinstance(new_dict.get('amenity_ids'), list):
+                new_dict['amenity_ids'] = list(new_dict['amenity_ids'])
+            return new_dict
+
     def __init__(self, *args, **kwargs):
         """initializes Place"""
         super().__init__(*args, **kwargs)
+        if models.storage_type != 'db':
+            amenity_ids = self.__dict__.get('amenity_ids', [])
+            if isinstance(amenity_ids, (list, tuple)):
+                object.__setattr__(self, 'amenity_ids',
+                                   AmenityIds(self, amenity_ids))
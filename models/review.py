@@ -1,6 +1,6 @@
 #!/usr/bin/python
 """ holds class Review"""
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 
 import models
 from models.base_model import BaseModel, Base
@@ -10,6 +10,8 @@ class Review(BaseModel, Base):
     """Representation of Review """
     if models.storage_type == 'db':
         __tablename__ = 'reviews'
+        __table_args__ = (Index('ft_reviews_text', 'text',
+                                mysql_prefix='FULLTEXT'),)
         place_id = Column(String(60), ForeignKey('places.id'), nullable=False)
         user_id = Column(String(60), ForeignKey('users.id'), nullable=False)
         text = Column(String(1024), nullable=False)
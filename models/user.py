@@ -25,6 +25,16 @@ class User(BaseModel, Base):
         first_name = ""
         last_name = ""
 
+        @property
+        def places(self):
+            """getter for list of place instances owned by the user"""
+            return models.storage.related("Place", "user_id", self.id)
+
+        @property
+        def reviews(self):
+            """getter for list of review instances written by the user"""
+            return models.storage.related("Review", "user_id", self.id)
+
     def __init__(self, *args, **kwargs):
         """initializes user"""
         super().__init__(*args, **kwargs)
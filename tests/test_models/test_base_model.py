@@ -142,3 +142,15 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(old_created_at, new_created_at)
         self.assertTrue(mock_storage.new.called)
         self.assertTrue(mock_storage.save.called)
+
+    def test_datetime_codec_round_trip(self):
+        """Test that the fast datetime codec matches the TIME_FORMAT
+        strftime/strptime pair exactly"""
+        t_format = models.base_model.TIME_FORMAT
+        for value in (datetime(2024, 3, 6, 15, 3, 51, 123456),
+                      datetime(2024, 3, 6, 15, 3, 51)):
+            with self.subTest(value=value):
+                text = models.base_model.format_datetime(value)
+                self.assertEqual(text, value.strftime(t_format))
+                self.assertEqual(models.base_model.parse_datetime(text),
+                                 datetime.strptime(text, t_format))
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+"""
+Contains the TestColumnsDocs and column store test classes
+"""
+
+import inspect
+import unittest
+
+import pep8
+
+from models.engine import columns
+from models.place import Place
+from models.review import Review
+
+Table = columns.Table
+
+
+class TestColumnsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of columns module"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.column_classes = inspect.getmembers(columns, inspect.isclass)
+
+    def test_pep8_conformance_columns(self):
+        """Test that models/engine/columns.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/columns.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_columns_module_docstring(self):
+        """Test for the columns.py module docstring"""
+        self.assertIsNot(columns.__doc__, None,
+                         "columns.py needs a docstring")
+        self.assertTrue(len(columns.__doc__) >= 1,
+                        "columns.py needs a docstring")
+
+    def test_columns_docstrings(self):
+        """Test for the presence of docstrings in column classes"""
+        for name, cls in self.column_classes:
+            self.assertIsNot(cls.__doc__, None,
+                             "{:s} class needs a docstring".format(name))
+            for func in inspect.getmembers(cls, inspect.isfunction):
+                self.assertIsNot(func[1].__doc__, None,
+                                 "{:s} method needs a docstring"
+                                 .format(func[0]))
+
+
+class TestTable(unittest.TestCase):
+    """Test the Table class, with and without NumPy"""
+
+    def setUp(self):
+        """Fill a table with places in two cities"""
+        self.table = Table("Place")
+        self.places = []
+        for i, city_id in enumerate(["a", "a", "b", "b", "b"]):
+            place = Place()
+            place.city_id = city_id
+            place.price_by_night = 10 * (i + 1)
+            self.places.append(place)
+            self.table.put("Place." + place.id, place)
+        self.places[4].latitude = None
+        self.table.put("Place." + self.places[4].id, self.places[4])
+
+    def aggregates(self):
+        """Check the aggregates of the table"""
+        table = self.table
+        self.assertEqual(table.aggregate(), 5)
+        self.assertEqual(table.aggregate("sum", "price_by_night"), 150)
+        self.assertEqual(table.aggregate("avg", "price_by_night"), 30.0)
+        self.assertEqual(table.aggregate("count", "latitude"), 4)
+        self.assertEqual(table.aggregate("max", "price_by_night",
+                                         {"price_by_night": (None, 35)}),
+                         30)
+        self.assertEqual(table.aggregate("min", "price_by_night",
+                                         group_by="city_id"),
+                         {"a": 10, "b": 30})
+        self.assertEqual(table.aggregate(filters={"city_id": "c"}), 0)
+        self.assertIsNone(table.aggregate("sum", "price_by_night",
+                                          {"city_id": "c"}))
+        self.assertEqual(table.aggregate(group_by="city_id",
+                                         filters={"price_by_night": 50}),
+                         {"b": 1})
+        self.assertRaises(ValueError, table.aggregate, "median", "max_guest")
+        self.assertRaises(ValueError, table.aggregate, "sum", "name")
+        self.assertRaises(ValueError, table.aggregate, "sum", "city_id")
+        self.assertRaises(ValueError, table.aggregate, group_by="name")
+        self.assertRaises(ValueError, table.aggregate,
+                          filters={"name": "Home"})
+
+    def test_aggregate(self):
+        """Test the aggregates with the installed backend"""
+        self.aggregates()
+
+    def test_aggregate_without_numpy(self):
+        """Test the aggregates computed without NumPy"""
+        numpy = columns.numpy
+        columns.numpy = None
+        try:
+            self.aggregates()
+        finally:
+            columns.numpy = numpy
+
+    def test_remove(self):
+        """Test that removing a row moves the last row into its place"""
+        table = self.table
+        table.remove("Place." + self.places[0].id)
+        table.remove("Place." + self.places[0].id)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table.rows["Place." + self.places[4].id], 0)
+        self.assertEqual(table.aggregate("sum", "price_by_night"), 140)
+        self.assertEqual(table.aggregate(group_by="city_id"),
+                         {"a": 1, "b": 3})
+
+    def test_uncovered_class(self):
+        """Test that a class without columns can still be counted"""
+        table = Table("Review")
+        table.put("Review.1", Review())
+        self.assertEqual(table.aggregate(), 1)
+        self.assertEqual(Table("").aggregate(), 0)
@@ -4,6 +4,7 @@ Contains the TestDBStorageDocs and TestDBStorage classes
 """
 
 import inspect
+import threading
 import unittest
 
 import pep8
@@ -68,3 +69,249 @@ test_db_storage.py'])
                              "{:s} method needs a docstring".format(func[0]))
             self.assertTrue(len(func[1].__doc__) >= 1,
                             "{:s} method needs a docstring".format(func[0]))
+
+
+class TestDBStorage(unittest.TestCase):
+    """Test the DBStorage class"""
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_all_eager_query_count(self):
+        """Test that eager-loaded relationships cost a constant number
+        of queries whatever the number of rows"""
+        storage = models.storage
+        for i in range(3):
+            state = State(name="State {}".format(i))
+            storage.new(state)
+            for j in range(2):
+                storage.new(City(name="City {}".format(j),
+                                 state_id=state.id))
+        storage.save()
+        storage.close()
+        with storage.count_queries() as statements:
+            states = storage.all(State, eager=["cities"])
+            for state in states.values():
+                [city.name for city in state.cities]
+        self.assertEqual(len(statements), 2)
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_all_one_query_per_table(self):
+        """Test that all() queries each mapped table once, skipping
+        BaseModel, and that stream() yields the same objects"""
+        storage = models.storage
+        storage.new(State(name="Streamed"))
+        storage.save()
+        with storage.count_queries() as statements:
+            objs = storage.all()
+        self.assertEqual(len(statements), len(classes))
+        streamed = {"State." + state.id
+                    for state in storage.stream(State, batch_size=1)}
+        self.assertEqual(streamed, set(storage.all(State).keys()))
+        self.assertTrue(streamed <= set(objs.keys()))
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_query(self):
+        """Test that query filters, orders and pages in SQL"""
+        storage = models.storage
+        state = State(name="Queried")
+        storage.new(state)
+        for name in ("b", "a", "c"):
+            storage.new(City(name=name, state_id=state.id))
+        storage.save()
+        with storage.count_queries() as statements:
+            found = storage.query(City, filters={"state_id": state.id},
+                                  order_by="-name", limit=2, offset=1)
+        self.assertEqual([city.name for city in found], ["b", "a"])
+        self.assertEqual(len(statements), 1)
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_aggregate(self):
+        """Test that aggregate counts and groups in one SQL query"""
+        storage = models.storage
+        state = State(name="Aggregated")
+        storage.new(state)
+        for name in ("a", "b"):
+            storage.new(City(name=name, state_id=state.id))
+        storage.save()
+        with storage.count_queries() as statements:
+            counts = storage.aggregate(City, "count", group_by="state_id")
+        self.assertEqual(counts[state.id], 2)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(storage.aggregate("City", "count",
+                                           filters={"state_id": state.id}),
+                         2)
+        self.assertEqual(storage.aggregate("BaseModel", "count"), 0)
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_places_near(self):
+        """Test that places_near selects the places within the radius,
+        nearest first"""
+        storage = models.storage
+        state = State(name="Near")
+        storage.new(state)
+        city = City(name="Paris", state_id=state.id)
+        storage.new(city)
+        user = User(email="near@hbnb.io", password="pwd")
+        storage.new(user)
+        places = []
+        for latitude, longitude in ((48.86, 2.36), (48.85, 2.35),
+                                    (51.5, -0.12)):
+            place = Place(name="Near", city_id=city.id, user_id=user.id,
+                          latitude=latitude, longitude=longitude)
+            storage.new(place)
+            places.append(place)
+        storage.save()
+        self.assertEqual(storage.places_near(48.85, 2.35, 10),
+                         [places[1], places[0]])
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_search(self):
+        """Test that search finds the reviews holding every word"""
+        storage = models.storage
+        state = State(name="Searched")
+        storage.new(state)
+        city = City(name="Searched", state_id=state.id)
+        storage.new(city)
+        user = User(email="search@hbnb.io", password="pwd")
+        storage.new(user)
+        place = Place(name="Searched", city_id=city.id, user_id=user.id)
+        storage.new(place)
+        reviews = [Review(text=text, place_id=place.id, user_id=user.id)
+                   for text in ("Wonderful balcony", "balcony viewing")]
+        for review in reviews:
+            storage.new(review)
+        storage.save()
+        self.assertEqual(storage.search(Review, "BALCONY wonderful"),
+                         [reviews[0]])
+        self.assertEqual(storage.search("Review", "view"), [])
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_search_places(self):
+        """Test that search_places combines amenities and locations in
+        one query"""
+        storage = models.storage
+        state = State(name="Filtered")
+        storage.new(state)
+        city = City(name="Filtered", state_id=state.id)
+        storage.new(city)
+        user = User(email="filtered@hbnb.io", password="pwd")
+        storage.new(user)
+        wifi, pool = Amenity(name="Wifi"), Amenity(name="Pool")
+        storage.new(wifi)
+        storage.new(pool)
+        places = []
+        for name, amenities in (("b", [wifi, pool]), ("a", [wifi])):
+            place = Place(name=name, city_id=city.id, user_id=user.id)
+            place.amenities.extend(amenities)
+            storage.new(place)
+            places.append(place)
+        storage.save()
+        with storage.count_queries() as statements:
+            found = storage.search_places([wifi.id, pool.id],
+                                          state_ids=[state.id])
+        self.assertEqual(found, places[:1])
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(storage.search_places([wifi.id, pool.id],
+                                               city_ids=[city.id],
+                                               match_all=False),
+                         [places[1], places[0]])
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_new_many(self):
+        """Test that new_many inserts the rows of a table at once"""
+        storage = models.storage
+        states = [State(name="Bulk {}".format(i)) for i in range(10)]
+        storage.new_many(states)
+        with storage.count_queries() as statements:
+            storage.save()
+        inserts = [statement for statement in statements
+                   if statement.startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertIs(storage.get(State, states[9].id), states[9])
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_batch(self):
+        """Test that batch commits once at its end, and rolls back on an
+        exception"""
+        storage = models.storage
+        with storage.count_queries() as statements:
+            with storage.batch():
+                states = [State(name="Batched"), State(name="Batched")]
+                for state in states:
+                    state.save()
+                self.assertEqual(statements, [])
+        self.assertEqual(len([statement for statement in statements
+                              if statement.startswith("INSERT")]), 1)
+        with self.assertRaises(KeyError):
+            with storage.batch():
+                State(name="Rolled back").save()
+                raise KeyError
+        self.assertEqual(storage.query(State,
+                                       filters={"name": "Rolled back"}), [])
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_batch_threads(self):
+        """Test that a batch only defers the saves of its own thread"""
+        storage = models.storage
+
+        def save_elsewhere():
+            """Save a state in another thread, with its own session."""
+            State(name="Other thread").save()
+            storage.close()
+
+        with self.assertRaises(KeyError):
+            with storage.batch():
+                State(name="Rolled back").save()
+                thread = threading.Thread(target=save_elsewhere)
+                thread.start()
+                thread.join()
+                raise KeyError
+        self.assertEqual(storage.query(State,
+                                       filters={"name": "Rolled back"}), [])
+        self.assertEqual(len(storage.query(
+            State, filters={"name": "Other thread"})), 1)
+
+    @unittest.skipIf(SKIP_DB, "not testing db storage")
+    def test_generation(self):
+        """Test that the generation changes with the saves of another
+        storage, as made by another process, including renames that keep
+        updated_at and swapped amenity links that keep the row counts"""
+        storage = models.storage
+        storage.close()
+        other = db_storage.DBStorage.__new__(db_storage.DBStorage)
+        other._DBStorage__engine = storage._DBStorage__engine
+        other.reload()
+        try:
+            generation = storage.generation()
+            self.assertEqual(storage.generation(), generation)
+            state = State(name="Elsewhere")
+            other.new(state)
+            other.save()
+            storage.close()
+            self.assertNotEqual(storage.generation(), generation)
+            generation = storage.generation()
+            state.name = "Renamed"
+            other.save()
+            storage.close()
+            self.assertNotEqual(storage.generation(), generation)
+            city = City(name="Town", state_id=state.id)
+            user = User(email="a@b.c", password="pwd")
+            place = Place(name="Home", city_id=city.id, user_id=user.id)
+            wifi, oven = Amenity(name="Wifi"), Amenity(name="Oven")
+            for obj in (city, user, place, wifi, oven):
+                other.new(obj)
+            place.amenities.append(wifi)
+            other.save()
+            storage.close()
+            generation = storage.generation()
+            place.amenities[:] = [oven]
+            other.save()
+            storage.close()
+            self.assertNotEqual(storage.generation(), generation)
+            generation = storage.generation()
+            for obj in (place, wifi, oven, user, city, state):
+                other.delete(obj)
+            other.save()
+            storage.close()
+            self.assertNotEqual(storage.generation(), generation)
+        finally:
+            other.close()
@@ -5,7 +5,14 @@ Contains the TestFileStorageDocs classes
 
 import inspect
 import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
 import unittest
+from unittest import mock
 
 import pep8
 
@@ -13,7 +20,8 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
-from models.engine import file_storage
+from models.engine import file_storage, formats, journal, shards
+from models.engine.columns import ColumnIndex
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -22,6 +30,27 @@ from models.user import User
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
+WORKER = """
+import sys
+from models import storage
+from models.state import State
+own = storage.get(State, sys.argv[1])
+for i in range(int(sys.argv[2])):
+    State(name="{}-{:d}".format(own.id, i)).save()
+    own.name = str(i)
+    own.save()
+"""
+
+
+def environment(**settings):
+    """Build the environment of a storage process, with the given
+    settings and none of the HBNB_ ones of this process."""
+    env = {name: value for name, value in os.environ.items()
+           if not name.startswith("HBNB_")}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(os.path.abspath(
+        models.__file__)))
+    env.update(settings)
+    return env
 
 
 class TestFileStorageDocs(unittest.TestCase):
@@ -65,6 +94,37 @@ class TestFileStorageDocs(unittest.TestCase):
 class TestFileStorage(unittest.TestCase):
     """Test the FileStorage class"""
 
+    def setUp(self):
+        """Run each test on an empty storage in a temporary directory,
+        with every mode of FileStorage off whatever the environment"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "file.json")
+        settings = dict(file_path=self.path, multiprocess=False,
+                        sharded=False, shards=1, journal=False, lazy=False,
+                        compact_objects=False, columns=None,
+                        codec=formats.Codec(), write_behind=False,
+                        flush_interval=1, flush_dirty=1000,
+                        compact_every=1000, objects={}, raw={},
+                        dirty=set(), volatile=set(), fragments={},
+                        fragment_objects=None, pending={}, log_records=0,
+                        disk_state={}, disk_objects=None,
+                        disk_signature=None, disk_version=None,
+                        indexed_objects=None, strings={}, loaded=set(),
+                        shard_keys={}, shard_signatures={},
+                        unflushed=False)
+        self.saved = {name: getattr(FileStorage, "_FileStorage__" + name)
+                      for name in settings}
+        for name, value in settings.items():
+            setattr(FileStorage, "_FileStorage__" + name, value)
+
+    def tearDown(self):
+        """Restore the storage and its modes, and remove the files"""
+        for name, value in self.saved.items():
+            setattr(FileStorage, "_FileStorage__" + name, value)
+        FileStorage._FileStorage__indexed_objects = None
+        FileStorage._FileStorage__fragment_objects = None
+        self.tmp_dir.cleanup()
+
     @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
     def test_all_returns_dict(self):
         """Test that all returns the FileStorage.__objects attr"""
@@ -77,8 +137,6 @@ class TestFileStorage(unittest.TestCase):
     def test_new(self):
         """test that new adds an object to the FileStorage.__objects attr"""
         storage = FileStorage()
-        save = FileStorage._FileStorage__objects
-        FileStorage._FileStorage__objects = {}
         test_dict = {}
         for key, value in classes.items():
             with self.subTest(key=key, value=value):
@@ -87,7 +145,6 @@ class TestFileStorage(unittest.TestCase):
                 storage.new(instance)
                 test_dict[instance_key] = instance
                 self.assertEqual(test_dict, storage._FileStorage__objects)
-        FileStorage._FileStorage__objects = save
 
     @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
     def test_save(self):
@@ -98,13 +155,600 @@ class TestFileStorage(unittest.TestCase):
             instance = value()
             instance_key = instance.__class__.__name__ + "." + instance.id
             new_dict[instance_key] = instance
-        save = FileStorage._FileStorage__objects
         FileStorage._FileStorage__objects = new_dict
         storage.save()
-        FileStorage._FileStorage__objects = save
         for key, value in new_dict.items():
             new_dict[key] = value.to_dict()
         string = json.dumps(new_dict)
-        with open("file.json", "r") as f:
+        with open(self.path, "r") as f:
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_journal_replay(self):
+        """Test that journal mode appends records which reload replays
+        into the same objects, before and after compaction"""
+        storage = FileStorage()
+        path = self.path
+        FileStorage._FileStorage__journal = True
+        kept = State(name="California")
+        gone = City(name="Reno")
+        storage.new(kept)
+        storage.new(gone)
+        storage.save()
+        storage.delete(gone)
+        storage.save()
+        kept.name = "Nevada"
+        storage.save()
+        self.assertFalse(os.path.exists(path))
+        with open(path + ".log", "r") as f:
+            self.assertEqual(len(f.readlines()), 4)
+        expected = {"State." + kept.id: kept.to_dict()}
+        for compact in (False, True):
+            if compact:
+                storage.compact(wait=True)
+                self.assertFalse(os.path.exists(path + ".log"))
+            FileStorage._FileStorage__objects = {}
+            storage.reload()
+            loaded = {key: obj.to_dict() for key, obj
+                      in storage.all().items()}
+            self.assertEqual(loaded, expected)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_compact_at_exit(self):
+        """Test that a process exiting during a background compaction
+        waits for it, leaving no sealed log behind"""
+        script = ("from models.state import State\n"
+                  "for i in range(30):\n"
+                  "    State(name=str(i)).save()\n")
+        subprocess.run([sys.executable, "-c", script], cwd=self.tmp_dir.name,
+                       env=environment(HBNB_FILE_JOURNAL="1",
+                                       HBNB_FILE_COMPACT_EVERY="5"),
+                       check=True, timeout=120)
+        self.assertNotIn("file.json.log.1", os.listdir(self.tmp_dir.name))
+        obj_dicts = formats.load(self.path)
+        journal.replay(self.path + ".log", obj_dicts)
+        self.assertEqual(len(obj_dicts), 30)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_reload_unchanged_file(self):
+        """Test that reload keeps the objects while the file is unchanged
+        and rebuilds only the changed ones when it is not"""
+        storage = FileStorage()
+        path = self.path
+        same, changed, gone = State(), State(), State()
+        for obj in (same, changed, gone):
+            storage.new(obj)
+        storage.save()
+        storage.close()
+        self.assertIs(storage.all()["State." + same.id], same)
+        with open(path, "r") as f:
+            on_disk = json.load(f)
+        on_disk["State." + changed.id]["name"] = "Nevada"
+        del on_disk["State." + gone.id]
+        with open(path, "w") as f:
+            json.dump(on_disk, f)
+        storage.close()
+        objs = storage.all()
+        self.assertIs(objs["State." + same.id], same)
+        self.assertEqual(objs["State." + changed.id].name, "Nevada")
+        self.assertNotIn("State." + gone.id, objs)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_all_by_class(self):
+        """Test that all filters by class or class name, including
+        subclasses, and follows new and delete"""
+        storage = FileStorage()
+        state, city = State(), City()
+        storage.new(state)
+        storage.new(city)
+        key = "State." + state.id
+        self.assertEqual(storage.all(State), {key: state})
+        self.assertEqual(storage.all("State"), {key: state})
+        self.assertEqual(storage.all("Nope"), {})
+        self.assertEqual(len(storage.all(BaseModel)), 2)
+        storage.delete(state)
+        self.assertEqual(storage.all(State), {})
+        FileStorage._FileStorage__objects = {key: state}
+        self.assertEqual(storage.all("State"), {key: state})
+        self.assertEqual(storage.all(City), {})
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_related_follows_updates(self):
+        """Test that related objects are found through the foreign key
+        index, which follows attribute updates and deletes"""
+        storage = models.storage
+        california, nevada = State(), State()
+        city = City(state_id=california.id)
+        for obj in (california, nevada, city):
+            storage.new(obj)
+        self.assertEqual(california.cities, [city])
+        self.assertEqual(nevada.cities, [])
+        city.state_id = nevada.id
+        self.assertEqual(california.cities, [])
+        self.assertEqual(nevada.cities, [city])
+        place = Place(city_id=city.id)
+        storage.new(place)
+        self.assertEqual(city.places, [place])
+        self.assertEqual(storage.related(Place, "name", ""), [place])
+        storage.delete(city)
+        self.assertEqual(nevada.cities, [])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_query(self):
+        """Test that query filters, orders and pages objects"""
+        storage = FileStorage()
+        city = City()
+        places = [Place(name=name, city_id=city.id)
+                  for name in ("b", "d", "a", "c")]
+        for obj in places + [Place(name="e"), city]:
+            storage.new(obj)
+        found = storage.query(Place, filters={"city_id": city.id},
+                              order_by="name", limit=2, offset=1)
+        self.assertEqual([p.name for p in found], ["b", "c"])
+        found = storage.query("Place", order_by="-name", offset=3)
+        self.assertEqual([p.name for p in found], ["b", "a"])
+        found = storage.query(Place, filters={"name": "d"})
+        self.assertEqual(found, [places[1]])
+        self.assertEqual(storage.query("Nope", order_by="name"), [])
+        self.assertEqual(storage.related("Nope", "city_id", city.id), [])
+        self.assertEqual(storage.new_records("Nope", [{"id": "1"}]), 0)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_query_by_name_index(self):
+        """Test that query orders by name from the index, following
+        renames"""
+        storage = models.storage
+        states = [State(name=name) for name in ("b", "C", "a")]
+        for state in states:
+            storage.new(state)
+        states[2].name = "D"
+        found = storage.query(State, order_by="name", limit=2)
+        self.assertEqual([s.name for s in found], ["b", "C"])
+        found = storage.query(State, order_by="-name", offset=1)
+        self.assertEqual([s.name for s in found], ["C", "b"])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_generation(self):
+        """Test that save and delete change the generation"""
+        storage = FileStorage()
+        state = State()
+        storage.new(state)
+        generation = storage.generation()
+        storage.save()
+        self.assertNotEqual(storage.generation(), generation)
+        generation = storage.generation()
+        storage.delete(state)
+        self.assertNotEqual(storage.generation(), generation)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_lazy_reload(self):
+        """Test that lazy mode builds objects only when accessed, and
+        saves the ones never accessed unchanged"""
+        storage = FileStorage()
+        path = self.path
+        state, city, user = State(), City(), User()
+        for obj in (state, city, user):
+            storage.new(obj)
+        storage.save()
+        with open(path, "r") as f:
+            on_disk = json.load(f)
+        FileStorage._FileStorage__lazy = True
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(len(storage._FileStorage__objects), 0)
+        got = storage.get(State, state.id)
+        self.assertEqual(got.to_dict(), state.to_dict())
+        self.assertEqual(len(storage._FileStorage__objects), 1)
+        self.assertEqual(list(storage.all(City)), ["City." + city.id])
+        self.assertEqual(len(storage._FileStorage__objects), 2)
+        storage.save()
+        with open(path, "r") as f:
+            self.assertEqual(json.load(f), on_disk)
+        self.assertEqual(len(storage.all()), 3)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_compact_objects(self):
+        """Test that compact mode reloads the same objects in less memory"""
+        storage = FileStorage()
+        places = [Place() for i in range(10)]
+        for i in range(2000):
+            review = Review()
+            review.place_id = places[i % 10].id
+            review.user_id = places[i % 10].id
+            review.text = "Review {}".format(i)
+            review.updated_at = review.created_at
+            storage.new(review)
+        storage.save()
+        with open(self.path, "r") as f:
+            on_disk = json.load(f)
+        usage = {}
+        for compact in (False, True):
+            FileStorage._FileStorage__compact_objects = compact
+            FileStorage._FileStorage__objects = {}
+            tracemalloc.start()
+            storage.reload()
+            usage[compact] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            self.assertEqual({key: obj.to_dict() for key, obj in
+                              storage.all().items()}, on_disk)
+        self.assertLess(usage[True], usage[False] * 0.75)
+        review = storage.all(Review).popitem()[1]
+        self.assertIs(review.updated_at, review.created_at)
+        storage.delete(review)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(len(storage.all()), 1999)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_aggregate(self):
+        """Test that aggregate follows changes with and without the
+        column mirror"""
+        storage = FileStorage()
+        places = [Place(), Place(), Place()]
+        for i, place in enumerate(places):
+            place.city_id = "a" if i else "b"
+            place.price_by_night = 100 * (i + 1)
+            storage.new(place)
+        storage.new(BaseModel())
+        for columns in (None, ColumnIndex()):
+            FileStorage._FileStorage__columns = columns
+            FileStorage._FileStorage__indexed_objects = None
+            with mock.patch.object(file_storage, "Table") as table:
+                self.assertEqual(storage.aggregate(Place), 3)
+                self.assertEqual(storage.aggregate("BaseModel"), 1)
+                self.assertFalse(table.called)
+            self.assertEqual(storage.aggregate("Nope"), 0)
+            self.assertEqual(storage.aggregate(Place, "sum",
+                                               "price_by_night",
+                                               group_by="city_id"),
+                             {"a": 500, "b": 100})
+            places[0].city_id = "a"
+            self.assertEqual(storage.aggregate(
+                Place, "avg", "price_by_night",
+                filters={"city_id": "a", "price_by_night": (150, None)}),
+                250.0)
+            self.assertEqual(storage.aggregate(
+                Place, filters={"city_id": "a"}), 3)
+            storage.delete(places[2])
+            self.assertEqual(storage.aggregate(Place, "max",
+                                               "price_by_night"), 200)
+            storage.new(places[2])
+            places[0].city_id = "b"
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_places_near(self):
+        """Test that places_near follows changes to the coordinates"""
+        storage = FileStorage()
+        paris, london = Place(), Place()
+        paris.latitude, paris.longitude = 48.8566, 2.3522
+        london.latitude, london.longitude = 51.5074, -0.1278
+        storage.new(paris)
+        storage.new(london)
+        storage.new(Place())
+        self.assertEqual(storage.places_near(0, 0, 5), [])
+        self.assertEqual(storage.places_near(48.85, 2.35, 10), [paris])
+        self.assertEqual(storage.places_near(51, 1, 500), [london, paris])
+        self.assertEqual(storage.places_near(51, 1, 500, limit=1), [london])
+        london.latitude = 48.86
+        london.longitude = 2.35
+        self.assertEqual(len(storage.places_near(48.85, 2.35, 10)), 2)
+        storage.delete(paris)
+        self.assertEqual(storage.places_near(48.85, 2.35, 10), [london])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_search(self):
+        """Test that search follows changes to the text of reviews"""
+        storage = FileStorage()
+        review, place = Review(), Place()
+        review.text = "Great view"
+        place.description = "A great flat"
+        storage.new(review)
+        storage.new(place)
+        self.assertEqual(storage.search(Review, "great"), [review])
+        self.assertEqual(storage.search("Place", "Great"), [place])
+        self.assertEqual(storage.search(State, "great"), [])
+        self.assertEqual(storage.search("Nope", "great"), [])
+        review.text = "Quiet street"
+        self.assertEqual(storage.search(Review, "great"), [])
+        self.assertEqual(storage.search(Review, "street quiet"), [review])
+        storage.delete(review)
+        self.assertEqual(storage.search(Review, "quiet"), [])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_search_places(self):
+        """Test that search_places combines amenities and locations"""
+        storage = FileStorage()
+        state = State()
+        cities = [City(), City()]
+        cities[0].state_id = state.id
+        wifi, pool = Amenity(), Amenity()
+        places = [Place(), Place(), Place()]
+        for obj in [state, wifi, pool] + cities + places:
+            storage.new(obj)
+        for place, name, city, amenities in zip(
+                places, "bac", (0, 0, 1), ([wifi, pool], [wifi], [])):
+            place.name = name
+            place.city_id = cities[city].id
+            place.link_amenities(amenities)
+        ids = [wifi.id, pool.id]
+        self.assertEqual(storage.search_places(ids), places[:1])
+        self.assertEqual(storage.search_places(ids, match_all=False),
+                         [places[1], places[0]])
+        self.assertEqual(storage.search_places(),
+                         [places[1], places[0], places[2]])
+        self.assertEqual(storage.search_places(city_ids=[cities[1].id]),
+                         places[2:])
+        self.assertEqual(storage.search_places([wifi.id],
+                                               state_ids=[state.id],
+                                               limit=1, offset=1),
+                         places[:1])
+        places[0].unlink_amenities([pool])
+        self.assertEqual(storage.search_places(ids), [])
+        storage.delete(places[1])
+        self.assertEqual(storage.search_places([wifi.id]), places[:1])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_new_many(self):
+        """Test that new_many stores and indexes objects like new"""
+        storage = FileStorage()
+        state = State()
+        cities = [City(), City()]
+        for city in cities:
+            city.state_id = state.id
+        storage.new_many([state] + cities)
+        self.assertEqual(len(storage.all()), 3)
+        self.assertCountEqual(state.cities, cities)
+        self.assertIs(storage.get(City, cities[1].id), cities[1])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_batch(self):
+        """Test that batch writes once at its end, and rolls back to the
+        saved file on an exception"""
+        storage = FileStorage()
+        path = self.path
+        with storage.batch():
+            states = [State(), State()]
+            for state in states:
+                state.save()
+                with storage.batch():
+                    City().save()
+            self.assertFalse(os.path.exists(path))
+        with open(path, "r") as f:
+            self.assertEqual(len(json.load(f)), 4)
+        with self.assertRaises(KeyError):
+            with storage.batch():
+                State().save()
+                states[0].name = "Renamed"
+                storage.delete(states[1])
+                storage.save()
+                raise KeyError
+        self.assertEqual(len(storage.all(State)), 2)
+        saved = storage.get(State, states[0].id)
+        self.assertEqual(saved.to_dict(), {
+            key: value for key, value in states[0].to_dict().items()
+            if key != "name"})
+        State().save()
+        self.assertEqual(len(storage.all(State)), 3)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_save_dirty_only(self):
+        """Test that save only serializes the objects added, changed or
+        deleted since the last save, and writes the same file"""
+        storage = FileStorage()
+        states = [State(name=str(i)) for i in range(10)]
+        storage.new_many(states)
+        storage.save()
+        with mock.patch.object(BaseModel, "to_dict", autospec=True,
+                               side_effect=BaseModel.to_dict) as spy:
+            storage.save()
+            self.assertEqual(spy.call_count, 0)
+            states[0].name = "Renamed"
+            states[1].save()
+            storage.delete(states[2])
+            storage.new(City(state_id=states[3].id))
+            storage.save()
+            self.assertEqual(spy.call_count, 3)
+        with open(self.path, "r") as f:
+            saved = json.load(f)
+        self.assertEqual(saved, {key: obj.to_dict() for key, obj in
+                                 storage.all().items()})
+        self.assertEqual(saved["State." + states[0].id]["name"], "Renamed")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(len(storage.all()), 10)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_save_in_place_changes(self):
+        """Test that lists changed in place are saved, in the single file
+        and in sharded mode"""
+        storage = FileStorage()
+        for sharded in (False, True):
+            FileStorage._FileStorage__file_path = os.path.join(
+                self.tmp_dir.name, str(sharded), "file.json")
+            os.mkdir(os.path.dirname(FileStorage._FileStorage__file_path))
+            FileStorage._FileStorage__sharded = sharded
+            FileStorage._FileStorage__objects = {}
+            storage.reload()
+            place, amenity = Place(), Amenity()
+            place.tags = []
+            storage.new_many([place, amenity])
+            storage.save()
+            FileStorage._FileStorage__objects = {}
+            storage.reload()
+            loaded = storage.get(Place, place.id)
+            loaded.amenity_ids.append(amenity.id)
+            loaded.tags.append("quiet")
+            storage.save()
+            FileStorage._FileStorage__objects = {}
+            storage.reload()
+            loaded = storage.get(Place, place.id)
+            self.assertEqual(loaded.amenity_ids, [amenity.id])
+            self.assertEqual(loaded.tags, ["quiet"])
+            loaded.tags.append("bright")
+            storage.save()
+            FileStorage._FileStorage__objects = {}
+            storage.reload()
+            self.assertEqual(storage.get(Place, place.id).tags,
+                             ["quiet", "bright"])
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_sharded(self):
+        """Test that sharded mode splits the single file, reads a class
+        on first access and only rewrites the files of dirty objects"""
+        storage = FileStorage()
+        tmp_dir = self.tmp_dir.name
+        state = State(name="California")
+        amenity = Amenity(name="Wifi")
+        reviews = [Review(text=str(i)) for i in range(10)]
+        storage.new_many([state, amenity] + reviews)
+        storage.save()
+        FileStorage._FileStorage__sharded = True
+        FileStorage._FileStorage__shards = 2
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(sorted(os.listdir(tmp_dir)),
+                         ["file.Amenity.json", "file.Review.0.json",
+                          "file.Review.1.json", "file.State.json"])
+        self.assertEqual(FileStorage._FileStorage__objects, {})
+        self.assertEqual(list(storage.all(State)), ["State." + state.id])
+        self.assertEqual(FileStorage._FileStorage__loaded, {"State"})
+        signatures = {name: shards.signature(os.path.join(tmp_dir, name))
+                      for name in os.listdir(tmp_dir)}
+        storage.get(Amenity, amenity.id).name = "WiFi"
+        storage.save()
+        for name, signature in signatures.items():
+            self.assertEqual(
+                shards.signature(os.path.join(tmp_dir, name)) == signature,
+                name != "file.Amenity.json", name)
+        self.assertEqual(len(storage.all()), 12)
+        FileStorage._FileStorage__shards = 4
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        for name in os.listdir(tmp_dir):
+            path = os.path.join(tmp_dir, name)
+            for key in shards.read(path):
+                self.assertEqual(shards.locate(self.path, key, 4), path)
+        for review in reviews[:5]:
+            storage.delete(storage.get(Review, review.id))
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(len(storage.all(Review)), 5)
+        self.assertEqual(len(storage.all()), 7)
+        FileStorage._FileStorage__sharded = False
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(os.listdir(tmp_dir), ["file.json"])
+        self.assertEqual(storage.get(Amenity, amenity.id).name, "WiFi")
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_write_behind(self):
+        """Test that write-behind mode joins saves into one write, made
+        by flush() or by the background thread once enough objects are
+        dirty"""
+        storage = FileStorage()
+        path = self.path
+        FileStorage._FileStorage__write_behind = True
+        FileStorage._FileStorage__flush_interval = 60
+        FileStorage._FileStorage__flush_dirty = 3
+        with mock.patch.object(shards, "write", wraps=shards.write) as write:
+            states = [State(name=str(i)) for i in range(2)]
+            for state in states:
+                state.save()
+            self.assertFalse(os.path.exists(path))
+            storage.flush()
+            storage.flush()
+            self.assertEqual(write.call_count, 1)
+            for i in range(3):
+                State(name="Dirty").save()
+            for i in range(100):
+                if write.call_count == 2:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(write.call_count, 2)
+        with open(path, "r") as f:
+            self.assertEqual(len(json.load(f)), 5)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    @unittest.skipIf(file_storage.fcntl is None, "no fcntl file locks")
+    def test_multiprocess(self):
+        """Test that processes saving the same file at the same time in
+        multi-process mode lose none of each other's objects"""
+        storage = FileStorage()
+        workers, saves = 4, 25
+        env = environment(HBNB_FILE_MULTIPROCESS="1")
+        states = [State(name="Start") for i in range(workers)]
+        storage.new_many(states)
+        storage.save()
+        processes = [subprocess.Popen([sys.executable, "-c", WORKER,
+                                       state.id, str(saves)],
+                                      cwd=self.tmp_dir.name, env=env)
+                     for state in states]
+        for process in processes:
+            self.assertEqual(process.wait(timeout=120), 0)
+        names = [obj_dict["name"]
+                 for obj_dict in formats.load(self.path).values()]
+        self.assertEqual(len(names), workers * (saves + 1))
+        self.assertEqual(names.count(str(saves - 1)), workers)
+        for state in states:
+            for i in range(saves):
+                self.assertIn("{}-{:d}".format(state.id, i), names)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_multiprocess_without_fcntl(self):
+        """Test that multi-process mode fails at startup when the fcntl
+        module is missing"""
+        process = subprocess.run(
+            [sys.executable, "-c",
+             "import sys; sys.modules['fcntl'] = None; import models"],
+            cwd=self.tmp_dir.name,
+            env=environment(HBNB_FILE_MULTIPROCESS="1"),
+            capture_output=True, text=True, timeout=120)
+        self.assertNotEqual(process.returncode, 0)
+        self.assertIn("RuntimeError: HBNB_FILE_MULTIPROCESS needs the fcntl",
+                      process.stderr)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_incompatible_modes(self):
+        """Test that combining multi-process, sharded and journal modes
+        fails at startup"""
+        for first, second in (("MULTIPROCESS", "SHARDED"),
+                              ("MULTIPROCESS", "JOURNAL"),
+                              ("SHARDED", "JOURNAL")):
+            with self.subTest(first=first, second=second):
+                settings = {"HBNB_FILE_" + first: "1",
+                            "HBNB_FILE_" + second: "1"}
+                process = subprocess.run(
+                    [sys.executable, "-c", "import models"],
+                    cwd=self.tmp_dir.name, env=environment(**settings),
+                    capture_output=True, text=True, timeout=120)
+                self.assertNotEqual(process.returncode, 0)
+                self.assertIn("RuntimeError: HBNB_FILE_" + first,
+                              process.stderr)
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_file_format(self):
+        """Test that the file is written with the configured codec and
+        read back whatever codec is configured when reloading"""
+        storage = FileStorage()
+        path = self.path
+        FileStorage._FileStorage__codec = formats.Codec("compact", "gzip")
+        states = [State(name=str(i)) for i in range(3)]
+        storage.new_many(states + [Amenity(name="Wifi")])
+        storage.save()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(2), formats.GZIP_MAGIC)
+        FileStorage._FileStorage__codec = formats.Codec()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(sorted(obj.name for obj in
+                                storage.all(State).values()),
+                         ["0", "1", "2"])
+        self.assertEqual(storage.get(State, states[1].id).to_dict(),
+                         states[1].to_dict())
+        storage.get(State, states[0].id).name = "Changed"
+        storage.save()
+        with open(path, "r") as f:
+            self.assertEqual(len(json.load(f)), 4)
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+"""
+Contains the TestFormatsDocs and formats test classes
+"""
+
+import inspect
+import json
+import os
+import tempfile
+import unittest
+
+import pep8
+
+from models.engine import formats
+
+
+class TestFormatsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of formats module"""
+
+    def test_pep8_conformance_formats(self):
+        """Test that models/engine/formats.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/formats.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_formats_module_docstring(self):
+        """Test for the formats.py module docstring"""
+        self.assertIsNot(formats.__doc__, None,
+                         "formats.py needs a docstring")
+        self.assertTrue(len(formats.__doc__) >= 1,
+                        "formats.py needs a docstring")
+
+    def test_formats_func_docstrings(self):
+        """Test for the presence of docstrings in formats functions"""
+        for func in inspect.getmembers(formats, inspect.isfunction):
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} function needs a docstring"
+                             .format(func[0]))
+
+    def test_formats_class_docstrings(self):
+        """Test for the presence of docstrings in formats classes"""
+        for cls in inspect.getmembers(formats, inspect.isclass):
+            self.assertIsNot(cls[1].__doc__, None,
+                             "{:s} class needs a docstring".format(cls[0]))
+
+
+def make_dicts(count):
+    """Build dictionaries shaped like those of the models."""
+    obj_dicts = {}
+    for i in range(count):
+        obj_dict = {"id": str(i), "__class__": "Place",
+                    "created_at": "2017-09-28T21:03:54.052298",
+                    "name": "Place {:d}".format(i), "number_rooms": i,
+                    "latitude": i / 3, "amenity_ids": [str(i)]}
+        if i % 2:
+            obj_dict["description"] = "Odd"
+        obj_dicts["Place." + str(i)] = obj_dict
+    obj_dicts["State.s"] = {"id": "s", "__class__": "State", "name": "é"}
+    return obj_dicts
+
+
+def available(format_name, compression):
+    """Tell whether the packages of a codec are installed."""
+    try:
+        formats.Codec(format_name, compression)
+    except ImportError:
+        return False
+    return True
+
+
+class TestFormats(unittest.TestCase):
+    """Test the file formats and compressions"""
+
+    def test_round_trip(self):
+        """Test that every format and compression reads back what it
+        wrote, detected from the content alone"""
+        obj_dicts = make_dicts(40)
+        for format_name in formats.FORMATS:
+            for compression in (None,) + formats.COMPRESSIONS:
+                if not available(format_name, compression):
+                    continue
+                with self.subTest(format=format_name,
+                                  compression=compression):
+                    codec = formats.Codec(format_name, compression)
+                    self.assertEqual(formats.loads(codec.dumps(obj_dicts)),
+                                     obj_dicts)
+                    self.assertEqual(formats.loads(codec.dumps({})), {})
+
+    def test_json_unchanged(self):
+        """Test that the default codec writes the text json.dump did"""
+        obj_dicts = make_dicts(2)
+        self.assertEqual(formats.Codec().dumps(obj_dicts),
+                         json.dumps(obj_dicts).encode())
+
+    def test_errors(self):
+        """Test that unknown formats and compressions are refused"""
+        with self.assertRaises(ValueError):
+            formats.Codec("pickle")
+        with self.assertRaises(ValueError):
+            formats.Codec("json", "lzma")
+
+    def test_load(self):
+        """Test reading a file"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "file.json")
+            with self.assertRaises(FileNotFoundError):
+                formats.load(path)
+            with open(path, "wb") as f:
+                f.write(formats.Codec("compact", "gzip").dumps(make_dicts(3)))
+            self.assertEqual(formats.load(path), make_dicts(3))
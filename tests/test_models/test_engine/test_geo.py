@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+Contains the TestGeoDocs and geo test classes
+"""
+
+import inspect
+import unittest
+
+import pep8
+
+from models.engine import geo
+from models.place import Place
+
+
+class TestGeoDocs(unittest.TestCase):
+    """Tests to check the documentation and style of geo module"""
+
+    def test_pep8_conformance_geo(self):
+        """Test that models/engine/geo.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/geo.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_geo_module_docstring(self):
+        """Test for the geo.py module docstring"""
+        self.assertIsNot(geo.__doc__, None,
+                         "geo.py needs a docstring")
+        self.assertTrue(len(geo.__doc__) >= 1,
+                        "geo.py needs a docstring")
+
+    def test_geo_func_docstrings(self):
+        """Test for the presence of docstrings in geo functions"""
+        for func in inspect.getmembers(geo, inspect.isfunction):
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} function needs a docstring"
+                             .format(func[0]))
+
+
+class TestGeo(unittest.TestCase):
+    """Test the distance and bounding box computations"""
+
+    def test_haversine(self):
+        """Test the distance between Paris and London"""
+        distance = geo.haversine(48.8566, 2.3522, 51.5074, -0.1278)
+        self.assertAlmostEqual(distance, 343.5, delta=1)
+        self.assertEqual(geo.haversine(10, 20, 10, 20), 0)
+
+    def test_bounding_box(self):
+        """Test that the box holds the circle, split across the
+        antimeridian and widened to all longitudes near a pole"""
+        min_lat, max_lat, lon_ranges = geo.bounding_box(0, 0, 111.2)
+        self.assertAlmostEqual(min_lat, -1, places=2)
+        self.assertAlmostEqual(max_lat, 1, places=2)
+        self.assertEqual(len(lon_ranges), 1)
+        lon_ranges = geo.bounding_box(0, 179.5, 111.2)[2]
+        self.assertEqual(lon_ranges[0][1], 180)
+        self.assertEqual(lon_ranges[1][0], -180)
+        self.assertAlmostEqual(lon_ranges[1][1], -179.5, places=2)
+        self.assertEqual(geo.bounding_box(89.5, 0, 111.2)[2],
+                         [(-180, 180)])
+
+    def test_coordinates(self):
+        """Test that missing or invalid coordinates are ignored"""
+        place = Place()
+        self.assertIsNone(geo.coordinates(place))
+        place.latitude, place.longitude = 1, 2.5
+        self.assertEqual(geo.coordinates(place), (1.0, 2.5))
+        place.longitude = None
+        self.assertIsNone(geo.coordinates(place))
+        place.longitude = float("nan")
+        self.assertIsNone(geo.coordinates(place))
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+"""
+Contains the TestIndexesDocs and index test classes
+"""
+
+import inspect
+import unittest
+
+import pep8
+
+from models.city import City
+from models.engine import indexes
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+BitsetIndex = indexes.BitsetIndex
+ClassIndex = indexes.ClassIndex
+GridIndex = indexes.GridIndex
+TextIndex = indexes.TextIndex
+SortedIndex = indexes.SortedIndex
+
+
+class TestIndexesDocs(unittest.TestCase):
+    """Tests to check the documentation and style of indexes module"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.index_classes = inspect.getmembers(indexes, inspect.isclass)
+
+    def test_pep8_conformance_indexes(self):
+        """Test that models/engine/indexes.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/indexes.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_indexes_module_docstring(self):
+        """Test for the indexes.py module docstring"""
+        self.assertIsNot(indexes.__doc__, None,
+                         "indexes.py needs a docstring")
+        self.assertTrue(len(indexes.__doc__) >= 1,
+                        "indexes.py needs a docstring")
+
+    def test_indexes_docstrings(self):
+        """Test for the presence of docstrings in index classes"""
+        for name, cls in self.index_classes:
+            self.assertIsNot(cls.__doc__, None,
+                             "{:s} class needs a docstring".format(name))
+            for func in inspect.getmembers(cls, inspect.isfunction):
+                self.assertIsNot(func[1].__doc__, None,
+                                 "{:s} method needs a docstring"
+                                 .format(func[0]))
+
+
+class TestClassIndex(unittest.TestCase):
+    """Test the ClassIndex class"""
+
+    def test_lookup(self):
+        """Test that lookup returns a copy of the matching bucket"""
+        index = ClassIndex()
+        state, city = State(), City()
+        index.add("State." + state.id, state)
+        index.add("City." + city.id, city)
+        found = index.lookup(State)
+        self.assertEqual(found, {"State." + state.id: state})
+        found.clear()
+        index.discard("City." + city.id, city)
+        self.assertEqual(len(index.lookup(State)), 1)
+        self.assertEqual(index.lookup(City), {})
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test the SortedIndex class"""
+
+    def test_ordered(self):
+        """Test that objects are kept ordered case-insensitively as
+        their attribute changes"""
+        index = SortedIndex("name", ["State"])
+        states = [State(name=name) for name in ("b", "C", "a")]
+        for state in states:
+            index.add("State." + state.id, state)
+        index.add("City.1", City(name="0"))
+        self.assertTrue(index.covers(State, "name"))
+        self.assertFalse(index.covers(City, "name"))
+        names = [state.name for state in index.ordered(State)]
+        self.assertEqual(names, ["a", "b", "C"])
+        states[0].name = "d"
+        index.move("State." + states[0].id, states[0], "b")
+        index.discard("State." + states[2].id, states[2])
+        names = [state.name for state in index.ordered(State, reverse=True)]
+        self.assertEqual(names, ["d", "C"])
+
+
+class TestGridIndex(unittest.TestCase):
+    """Test the GridIndex class"""
+
+    def test_near(self):
+        """Test that places are found nearest first, across the
+        antimeridian, and follow their coordinates"""
+        index = GridIndex(["Place"])
+        places = []
+        for latitude, longitude in ((0, 179.99), (0, -179.98), (0, 170),
+                                    (None, None)):
+            place = Place()
+            place.latitude, place.longitude = latitude, longitude
+            index.add("Place." + place.id, place)
+            places.append(place)
+        found = index.near(Place, 0, 180, 5)
+        self.assertEqual([place for distance, place in found], places[:2])
+        self.assertLess(found[0][0], found[1][0])
+        self.assertEqual(len(index.near(Place, 0, 175, 20000)), 3)
+        places[2].longitude = 179.995
+        index.move("Place." + places[2].id, places[2], 170)
+        self.assertEqual(len(index.near(Place, 0, 180, 5)), 3)
+        index.discard("Place." + places[0].id, places[0])
+        self.assertEqual(len(index.near(Place, 0, 180, 5)), 2)
+        self.assertEqual(index.near(City, 0, 180, 5), [])
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test the TextIndex class"""
+
+    def test_search(self):
+        """Test that objects are found by all the words of a query,
+        ignoring case and punctuation, as their text changes"""
+        index = TextIndex({"Review": "text"})
+        reviews = [Review(), Review(), Review()]
+        for review, text in zip(reviews, ("Great view!", "great, quiet",
+                                          None)):
+            review.text = text
+            index.add("Review." + review.id, review)
+        found = index.search(Review, "GREAT")
+        self.assertCountEqual(found, reviews[:2])
+        self.assertEqual(index.search(Review, "view great"), [reviews[0]])
+        self.assertEqual(index.search(Review, "view nope"), [])
+        self.assertEqual(index.search(Review, " ,"), [])
+        reviews[0].text = "quiet"
+        index.move("Review." + reviews[0].id, reviews[0], "Great view!")
+        self.assertEqual(index.search(Review, "view"), [])
+        index.discard("Review." + reviews[1].id, reviews[1])
+        self.assertEqual(index.search(Review, "quiet"), [reviews[0]])
+        self.assertEqual(index.postings.get((Review, "great")), None)
+        self.assertEqual(indexes.tokenize("It's 2 o'clock"),
+                         {"it", "s", "2", "o", "clock"})
+
+
+class TestBitsetIndex(unittest.TestCase):
+    """Test the BitsetIndex class"""
+
+    def test_having(self):
+        """Test that amenities combine with AND and OR as places change,
+        and that freed bit numbers are reused"""
+        index = BitsetIndex("Place", "amenity_ids")
+        places = [Place() for i in range(3)]
+        for place, amenity_ids in zip(places, (["a", "b"], ["a"], [])):
+            place.amenity_ids = amenity_ids
+        index.add_many(("Place." + place.id, place) for place in places)
+        index.add("State.1", State())
+        self.assertEqual(index.members(index.having(["a", "b"])),
+                         places[:1])
+        self.assertEqual(index.members(index.having(["b", "a"], False)),
+                         places[:2])
+        self.assertEqual(index.members(index.having(["a", "c"])), [])
+        self.assertEqual(index.members(index.having([])), places)
+        self.assertEqual(index.having([], False), 0)
+        keys = ["Place." + place.id for place in places[1:]]
+        self.assertEqual(index.members(index.from_keys(keys)), places[1:])
+        places[1].amenity_ids = ["b"]
+        index.move(keys[0], places[1], ["a"])
+        self.assertEqual(index.members(index.having(["b"])), places[:2])
+        index.discard(keys[0], places[1])
+        self.assertEqual(index.members(index.having(["b"])), places[:1])
+        place = Place()
+        place.amenity_ids = ["b"]
+        index.add("Place." + place.id, place)
+        self.assertEqual(index.ordinals["Place." + place.id], 1)
+        self.assertEqual(index.members(index.having(["b"])),
+                         [places[0], place])
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Contains the TestJournalDocs and TestJournal classes
+"""
+
+import inspect
+import json
+import os
+import tempfile
+import unittest
+
+import pep8
+
+from models.engine import journal
+
+
+class TestJournalDocs(unittest.TestCase):
+    """Tests to check the documentation and style of journal module"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.journal_f = inspect.getmembers(journal, inspect.isfunction)
+
+    def test_pep8_conformance_journal(self):
+        """Test that models/engine/journal.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/journal.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_journal_module_docstring(self):
+        """Test for the journal.py module docstring"""
+        self.assertIsNot(journal.__doc__, None,
+                         "journal.py needs a docstring")
+        self.assertTrue(len(journal.__doc__) >= 1,
+                        "journal.py needs a docstring")
+
+    def test_journal_func_docstrings(self):
+        """Test for the presence of docstrings in journal functions"""
+        for func in self.journal_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} function needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} function needs a docstring".format(func[0]))
+
+
+class TestJournal(unittest.TestCase):
+    """Test the journal functions"""
+
+    def test_replay_skips_torn_line(self):
+        """Test that replay applies puts and deletes in order and
+        ignores a truncated last line"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_path = os.path.join(tmp_dir, "file.json.log")
+            journal.append(log_path, [["put", "State.1", {"id": "1"}],
+                                      ["put", "State.2", {"id": "2"}],
+                                      ["del", "State.1"]])
+            with open(log_path, "a") as f:
+                f.write('["put","State.3",{"id"')
+            obj_dicts = {"State.0": {"id": "0"}}
+            self.assertEqual(journal.replay(log_path, obj_dicts), 3)
+            self.assertEqual(obj_dicts, {"State.0": {"id": "0"},
+                                         "State.2": {"id": "2"}})
+
+    def test_compact(self):
+        """Test that compact merges a segment into the snapshot"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "file.json")
+            with open(path, "w") as f:
+                json.dump({"State.1": {"id": "1"}}, f)
+            journal.append(path + ".log.1", [["del", "State.1"],
+                                             ["put", "City.2", {"id": "2"}]])
+            journal.compact(path, path + ".log.1")
+            self.assertFalse(os.path.exists(path + ".log.1"))
+            with open(path, "r") as f:
+                self.assertEqual(json.load(f), {"City.2": {"id": "2"}})
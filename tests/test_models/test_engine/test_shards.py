@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+Contains the TestShardsDocs and shards test classes
+"""
+
+import inspect
+import json
+import os
+import tempfile
+import unittest
+
+import pep8
+
+from models.engine import shards
+
+
+class TestShardsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of shards module"""
+
+    def test_pep8_conformance_shards(self):
+        """Test that models/engine/shards.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/shards.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_shards_module_docstring(self):
+        """Test for the shards.py module docstring"""
+        self.assertIsNot(shards.__doc__, None,
+                         "shards.py needs a docstring")
+        self.assertTrue(len(shards.__doc__) >= 1,
+                        "shards.py needs a docstring")
+
+    def test_shards_func_docstrings(self):
+        """Test for the presence of docstrings in shards functions"""
+        for func in inspect.getmembers(shards, inspect.isfunction):
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} function needs a docstring"
+                             .format(func[0]))
+
+
+class TestShards(unittest.TestCase):
+    """Test the sharded file layout"""
+
+    def setUp(self):
+        """Create a temporary directory for the files"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "file.json")
+
+    def tearDown(self):
+        """Remove the temporary directory"""
+        self.tmp_dir.cleanup()
+
+    def files(self):
+        """List the files of the temporary directory"""
+        return sorted(os.listdir(self.tmp_dir.name))
+
+    def test_locate(self):
+        """Test that only the hashed classes are spread over shards, by
+        a hash that does not depend on the process"""
+        self.assertEqual(shards.locate(self.path, "State.1", 4),
+                         shards.shard_path(self.path, "State"))
+        self.assertEqual(shards.locate(self.path, "Review.abc", 1),
+                         shards.shard_path(self.path, "Review"))
+        self.assertEqual(shards.locate(self.path, "Review.abc", 4),
+                         shards.shard_path(self.path, "Review", 2))
+        self.assertEqual(shards.shard_paths(self.path, "Place", 2),
+                         [shards.shard_path(self.path, "Place", 0),
+                          shards.shard_path(self.path, "Place", 1)])
+
+    def test_migrate_and_merge(self):
+        """Test that the single file and its log are split into class
+        files, split again when the number of shards changes, and joined
+        back"""
+        obj_dicts = {"State.1": {"id": "1", "__class__": "State"}}
+        obj_dicts.update({"Review.{:d}".format(i):
+                          {"id": str(i), "__class__": "Review"}
+                          for i in range(10)})
+        with open(self.path, "w") as f:
+            json.dump(obj_dicts, f)
+        with open(self.path + ".log", "w") as f:
+            f.write(json.dumps(["del", "Review.0"]) + "\n")
+        del obj_dicts["Review.0"]
+        names = ("State", "Review")
+        shards.migrate(self.path, names, 4)
+        self.assertEqual(self.files(), ["file.Review.0.json",
+                                        "file.Review.1.json",
+                                        "file.Review.2.json",
+                                        "file.Review.3.json",
+                                        "file.State.json"])
+        shards.migrate(self.path, names, 2)
+        self.assertEqual(self.files(), ["file.Review.0.json",
+                                        "file.Review.1.json",
+                                        "file.State.json"])
+        read = {}
+        for name in self.files():
+            read.update(shards.read(os.path.join(self.tmp_dir.name, name)))
+        self.assertEqual(read, obj_dicts)
+        shards.migrate(self.path, names, 4)
+        self.assertEqual(len(self.files()), 5)
+        for name in self.files():
+            path = os.path.join(self.tmp_dir.name, name)
+            for key in shards.read(path):
+                self.assertEqual(shards.locate(self.path, key, 4), path)
+        shards.migrate(self.path, names, 2)
+        shards.merge(self.path, names)
+        self.assertEqual(self.files(), ["file.json"])
+        self.assertEqual(shards.read(self.path), obj_dicts)
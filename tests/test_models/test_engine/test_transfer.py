@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+"""
+Contains the TestTransferDocs and transfer test classes
+"""
+
+import inspect
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import pep8
+
+import models
+from models.amenity import Amenity
+from models.base_model import BaseModel
+from models.city import City
+from models.engine import transfer
+from models.place import Place
+from models.state import State
+from models.user import User
+
+
+class TestTransferDocs(unittest.TestCase):
+    """Tests to check the documentation and style of transfer module"""
+
+    def test_pep8_conformance_transfer(self):
+        """Test that models/engine/transfer.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/transfer.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_transfer_module_docstring(self):
+        """Test for the transfer.py module docstring"""
+        self.assertIsNot(transfer.__doc__, None,
+                         "transfer.py needs a docstring")
+        self.assertTrue(len(transfer.__doc__) >= 1,
+                        "transfer.py needs a docstring")
+
+    def test_transfer_func_docstrings(self):
+        """Test for the presence of docstrings in transfer functions"""
+        for func in inspect.getmembers(transfer, inspect.isfunction):
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} function needs a docstring"
+                             .format(func[0]))
+
+
+def make_objects():
+    """Build a small dataset with a place linked to an amenity."""
+    state = State(name="California")
+    city = City(name="San Francisco", state_id=state.id)
+    user = User(email="transfer@hbnb.io", password="pwd")
+    amenity = Amenity(name="Wifi")
+    place = Place(name="Loft", city_id=city.id, user_id=user.id)
+    return [state, city, user, amenity, place]
+
+
+class TestTransfer(unittest.TestCase):
+    """Test exporting and importing objects as JSON Lines"""
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_round_trip(self):
+        """Test that an export imported into an empty storage gives back
+        the same objects, writing the file once"""
+        from models.engine.file_storage import FileStorage
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                               "file.json")
+            FileStorage._FileStorage__objects = {}
+            try:
+                objects = make_objects() + [BaseModel()]
+                objects[4].amenity_ids = [objects[3].id]
+                storage.new_many(reversed(objects))
+                out = io.StringIO()
+                self.assertEqual(transfer.export_objects(storage, out), 6)
+                records = [json.loads(line)
+                           for line in out.getvalue().splitlines()]
+                self.assertEqual([record["__class__"] for record in records],
+                                 ["BaseModel", "State", "City", "User",
+                                  "Amenity", "Place"])
+                out.seek(0)
+                FileStorage._FileStorage__objects = {}
+                self.assertEqual(transfer.import_objects(storage, out, 2),
+                                 (6, 0))
+                self.assertEqual(
+                    sorted(obj.to_dict()["id"]
+                           for obj in storage.all().values()),
+                    sorted(obj.id for obj in objects))
+                place = storage.get(Place, objects[4].id)
+                self.assertEqual(place.amenity_ids, [objects[3].id])
+                self.assertIs(storage.related(City, "state_id",
+                                              objects[0].id)[0],
+                              storage.get(City, objects[1].id))
+                storage.reload()
+                self.assertEqual(len(storage.all()), 6)
+            finally:
+                FileStorage._FileStorage__file_path = "file.json"
+                FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing file storage")
+    def test_import_invalid_line(self):
+        """Test that an invalid line stores nothing"""
+        from models.engine.file_storage import FileStorage
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                               "file.json")
+            FileStorage._FileStorage__objects = {}
+            try:
+                lines = [json.dumps(State(name="Kept out").to_dict()), "",
+                         json.dumps({"__class__": "Unknown"})]
+                with self.assertRaisesRegex(ValueError, "line 3"):
+                    transfer.import_objects(storage, lines)
+                self.assertEqual(storage.all(), {})
+            finally:
+                FileStorage._FileStorage__file_path = "file.json"
+                FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_type != 'db', "not testing db storage")
+    def test_db_round_trip(self):
+        """Test that an import into the database keeps the links between
+        places and amenities, skips BaseModel objects, and that exporting
+        costs one query per table"""
+        storage = models.storage
+        objects = make_objects()
+        records = [transfer.to_record(obj) for obj in objects]
+        records[4]["amenity_ids"] = [objects[3].id]
+        lines = [json.dumps(BaseModel().to_dict())]
+        lines += [json.dumps(record) for record in records]
+        self.assertEqual(transfer.import_objects(storage, lines, 2), (5, 1))
+        storage.close()
+        place = storage.get(Place, objects[4].id)
+        self.assertEqual([amenity.id for amenity in place.amenities],
+                         [objects[3].id])
+        out = io.StringIO()
+        with storage.count_queries() as statements:
+            transfer.export_objects(storage, out, "Place")
+        self.assertEqual(len(statements), 2)
+        exported = [json.loads(line) for line in
+                    out.getvalue().splitlines()]
+        self.assertIn(objects[4].id, [record["id"] for record in exported])
+        for record in exported:
+            self.assertNotIn("amenities", record)
+            self.assertIsInstance(record["amenity_ids"], list)
@@ -165,7 +165,7 @@ class TestPlace(unittest.TestCase):
         """Test Place has attr amenity_ids, and it's an empty list"""
         place = Place()
         self.assertTrue(hasattr(place, "amenity_ids"))
-        self.assertEqual(type(place.amenity_ids), list)
+        self.assertIsInstance(place.amenity_ids, list)
         self.assertEqual(len(place.amenity_ids), 0)
 
     def test_to_dict_creates_dict(self):
@@ -189,3 +189,43 @@ class TestPlace(unittest.TestCase):
         self.assertEqual(type(new_d["updated_at"]), str)
         self.assertEqual(new_d["created_at"], p.created_at.strftime(t_format))
         self.assertEqual(new_d["updated_at"], p.updated_at.strftime(t_format))
+
+    @unittest.skipIf(models.storage_type == 'db', "not testing File Storage")
+    def test_link_amenities(self):
+        """Test that amenities are linked per place, once each, and can be
+        looked up from both sides"""
+        from models.amenity import Amenity
+        wifi, oven = Amenity(name="Wifi"), Amenity(name="Oven")
+        place, other = Place(), Place()
+        for obj in (wifi, oven, place, other):
+            models.storage.new(obj)
+        try:
+            place.link_amenities([wifi, oven, wifi])
+            place.amenities = oven
+            self.assertEqual(place.amenity_ids, [wifi.id, oven.id])
+            self.assertEqual(other.amenity_ids, [])
+            self.assertEqual(place.amenities, [wifi, oven])
+            self.assertEqual(oven.place_amenities, [place])
+            place.unlink_amenities([oven])
+            self.assertEqual(place.amenities, [wifi])
+            self.assertEqual(oven.place_amenities, [])
+            other.amenity_ids.append(oven.id)
+            other.amenity_ids.append(oven.id)
+            other.amenity_ids += [oven.id, wifi.id, wifi.id]
+            self.assertEqual(other.amenity_ids, [oven.id, wifi.id])
+            self.assertEqual(other.amenities, [oven, wifi])
+            self.assertIn(wifi.id, other.amenity_ids)
+            other.amenity_ids[1] = oven.id
+            self.assertEqual(other.amenity_ids, [oven.id])
+            self.assertNotIn(wifi.id, other.amenity_ids)
+            self.assertEqual(Place(amenity_ids=[wifi.id, wifi.id])
+                             .amenity_ids, [wifi.id])
+            self.assertEqual(oven.place_amenities, [other])
+            self.assertEqual(models.storage.search_places([oven.id]),
+                             [other])
+            other.amenity_ids.remove(oven.id)
+            self.assertEqual(oven.place_amenities, [])
+            self.assertEqual(other.to_dict()["amenity_ids"], [])
+        finally:
+            for obj in (wifi, oven, place, other):
+                models.storage.delete(obj)
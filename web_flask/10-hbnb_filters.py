@@ -10,29 +10,35 @@ all State and Amenity objects from the data storage.
 
 from flask import Flask, render_template
 from models import storage
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
 
 
 @app.route("/hbnb_filters", strict_slashes=False)
+@cached
 def hbnb_filters():
     """
     Route to display HBNB filters.
 
-    Retrieves all State and Amenity objects from the data storage,
-    and renders a template to display HBNB filters containing a list
-    of all State and Amenity objects.
+    Retrieves all State, City and Amenity objects from the data storage,
+    ordered by name, and renders a template to display HBNB filters
+    containing a list of all State and Amenity objects.
 
     Returns:
         str: Rendered HTML template with HBNB filters.
     """
-    states = storage.all("State")
-    amenities = storage.all("Amenity")
+    states = storage.query("State", order_by="name")
+    cities = {}
+    for city in storage.query("City", order_by="name"):
+        cities.setdefault(city.state_id, []).append(city)
+    amenities = storage.query("Amenity", order_by="name")
 
     return render_template(
         "10-hbnb_filters.html",
         states=states,
+        cities=cities,
         amenities=amenities
     )
 
@@ -5,37 +5,145 @@ Starts a Flask web application to display HBNB data.
 
 This module defines a Flask web application with a route to display HBNB data.
 The application retrieves and displays all State, Amenity, and Place objects
-from the data storage.
+from the data storage, the places near a point, and the places matching
+the filters.
 """
+from urllib.parse import urlencode
 
-from flask import Flask, render_template
+from flask import Flask, abort, render_template, request
 from models import storage
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
+PLACES_PER_PAGE = 20
 
 
 @app.route("/hbnb", strict_slashes=False)
+@cached
 def hbnb():
     """
     Route to display HBNB data.
 
     Retrieves all State, Amenity, and Place objects from the data storage,
     and renders a template to display HBNB data containing lists of all State,
-    Amenity, and Place objects.
+    Amenity, and Place objects, ordered by name. The cities are grouped by
+    State and the owner of each Place is loaded with it, so rendering issues
+    no further queries.
+
+    Places are listed by name, PLACES_PER_PAGE at a time; the page is
+    selected with the "page" query string argument, starting at 1.
+
+    Returns:
+        str: Rendered HTML template with HBNB data.
+    """
+    page = max(request.args.get("page", 1, type=int), 1)
+    places = storage.query("Place", order_by="name",
+                           limit=PLACES_PER_PAGE + 1,
+                           offset=(page - 1) * PLACES_PER_PAGE,
+                           eager=["user"])
+    return render_hbnb(places[:PLACES_PER_PAGE], page,
+                       len(places) > PLACES_PER_PAGE)
+
+
+@app.route("/hbnb/near", strict_slashes=False)
+@cached
+def hbnb_near():
+    """
+    Route to display HBNB data with the places near a point.
+
+    The point is given in degrees by the "lat" and "lon" query string
+    arguments, and the distance in kilometers by "radius", 10 by default.
+    The PLACES_PER_PAGE nearest places within that distance are listed,
+    nearest first.
+
+    Returns:
+        str: Rendered HTML template with HBNB data, or a 400 error if the
+        point or the distance is missing or invalid.
+    """
+    latitude = request.args.get("lat", type=float)
+    longitude = request.args.get("lon", type=float)
+    radius = request.args.get("radius", type=float)
+    if "radius" not in request.args:
+        radius = 10.0
+    if latitude is None or longitude is None or radius is None or \
+            not -90 <= latitude <= 90 or not -180 <= longitude <= 180 or \
+            not radius > 0:
+        abort(400)
+    places = storage.places_near(latitude, longitude, radius,
+                                 limit=PLACES_PER_PAGE, eager=["user"])
+    return render_hbnb(places, 1, False)
+
+
+@app.route("/hbnb/search", strict_slashes=False)
+@cached
+def hbnb_search():
+    """
+    Route to display HBNB data with the places matching the filters.
+
+    The filters are given by the query string: "amenities", "states" and
+    "cities" may each be repeated with an id. Places must have every
+    amenity, or any of them if "match" is "any", and be in one of the
+    cities or states if any is given. Places are listed by name,
+    PLACES_PER_PAGE at a time, as for /hbnb.
 
     Returns:
         str: Rendered HTML template with HBNB data.
     """
-    states = storage.all("State")
-    amenities = storage.all("Amenity")
-    places = storage.all("Place")
+    page = max(request.args.get("page", 1, type=int), 1)
+    amenity_ids = request.args.getlist("amenities")
+    places = storage.search_places(
+        amenity_ids=amenity_ids,
+        state_ids=request.args.getlist("states"),
+        city_ids=request.args.getlist("cities"),
+        match_all=request.args.get("match") != "any" or not amenity_ids,
+        limit=PLACES_PER_PAGE + 1,
+        offset=(page - 1) * PLACES_PER_PAGE,
+        eager=["user"])
+    return render_hbnb(places[:PLACES_PER_PAGE], page,
+                       len(places) > PLACES_PER_PAGE)
+
+
+def render_hbnb(places, page, has_next):
+    """
+    Render the HBNB page listing places.
+
+    The page also lists all State and Amenity objects ordered by name,
+    with the cities grouped by State, as filters checked when the request
+    selected them. The links to the previous and next pages keep the
+    other query string arguments.
+
+    Args:
+        places (list): The places to list.
+        page (int): The number of the page of places, starting at 1.
+        has_next (bool): Whether there is a page after this one.
+
+    Returns:
+        str: Rendered HTML template with HBNB data.
+    """
+    states = storage.query("State", order_by="name")
+    cities = {}
+    for city in storage.query("City", order_by="name"):
+        cities.setdefault(city.state_id, []).append(city)
+    amenities = storage.query("Amenity", order_by="name")
+
+    def page_url(number):
+        """Build the query string of another page of places."""
+        args = [(name, value) for name, value in request.args.items(True)
+                if name != "page"]
+        return "?" + urlencode(args + [("page", number)])
 
     return render_template(
         "100-hbnb.html",
         states=states,
+        cities=cities,
         amenities=amenities,
-        places=places
+        places=places,
+        selected=set(request.args.getlist("amenities") +
+                     request.args.getlist("states") +
+                     request.args.getlist("cities")),
+        previous_page=page_url(page - 1) if page > 1 else None,
+        next_page=page_url(page + 1) if has_next else None
     )
 
 
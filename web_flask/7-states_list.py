@@ -7,23 +7,25 @@ for managing and displaying states.
 
 from flask import Flask, render_template
 from models import storage
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
 
 
 @app.route("/states_list", strict_slashes=False)
+@cached
 def states_list():
     """
     Route to display a list of all State objects.
 
-    Retrieves all State objects from the data storage,
+    Retrieves all State objects from the data storage, ordered by name,
     and renders a template to display a list of states.
 
     Returns:
         str: Rendered HTML template with the list of states.
     """
-    states = storage.all("State")
+    states = storage.query("State", order_by="name")
     return render_template('7-states_list.html', states=states)
 
 
@@ -7,24 +7,31 @@ for managing and displaying states.
 
 from flask import Flask, render_template
 from models import storage
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
 
 
 @app.route("/cities_by_states", strict_slashes=False)
+@cached
 def cities_by_states():
     """
     Route to display a list of all cities in States objects.
 
-    Retrieves all State objects from the data storage,
-    and renders a template to display a list of states.
+    Retrieves all State and City objects from the data storage, ordered
+    by name, and renders a template to display a list of states with
+    their cities.
 
     Returns:
         str: Rendered HTML template with the list of states.
     """
-    states = storage.all("State")
-    return render_template('8-cities_by_states.html', states=states)
+    states = storage.query("State", order_by="name")
+    cities = {}
+    for city in storage.query("City", order_by="name"):
+        cities.setdefault(city.state_id, []).append(city)
+    return render_template('8-cities_by_states.html', states=states,
+                           cities=cities)
 
 
 @app.teardown_appcontext
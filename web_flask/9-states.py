@@ -7,12 +7,14 @@ for managing and displaying states.
 
 from flask import Flask, render_template
 from models import storage
+from web_flask.page_cache import cached
 
 
 app = Flask(__name__)
 
 
 @app.route("/states", strict_slashes=False)
+@cached
 def states():
     """
     Displays a list of all State objects sorted by name.
@@ -23,17 +25,19 @@ def states():
     Returns:
         str: Rendered HTML template with the list of states.
     """
-    state = storage.all("State")
-    return render_template('9-states.html', state=state)
+    states = storage.query("State", order_by="name")
+    return render_template('9-states.html', states=states)
 
 
 @app.route("/states/<id>", strict_slashes=False)
+@cached
 def states_id(id):
     """
     Displays a list of City objects linked to a specific State or "Not found!".
 
     Retrieves a specific State object by id from the data storage,
-    and renders a template to display the list of cities linked to that state.
+    and renders a template to display the list of cities linked to that state,
+    ordered by name.
     If no State object is found with the specified id, displays "Not found!".
 
     Args:
@@ -42,11 +46,12 @@ def states_id(id):
     Returns:
         str: Rendered HTML template with the list of cities or "Not found!".
     """
-    for state in storage.all("State").values():
-        if state.id == id:
-            cities = state.cities
-            return render_template("9-states.html", state=state, cities=cities)
-    return render_template('9-states.html')
+    state = storage.get("State", id)
+    if state is None:
+        return render_template('9-states.html')
+    cities = storage.query("City", filters={"state_id": state.id},
+                           order_by="name")
+    return render_template("9-states.html", state=state, cities=cities)
 
 
 @app.teardown_appcontext
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+"""
+Caches rendered pages of the web_flask applications.
+
+A page is rendered once per storage generation and per route and query
+string. Repeat hits are served from memory with an ETag, so a client
+revalidating with If-None-Match gets a 304 Not Modified. Any save or
+delete in the storage bumps its generation and so invalidates the cache,
+including the ones made by other processes: DBStorage reads its
+generation from the database, and FileStorage in multi-process mode
+reloads the changed file.
+"""
+
+import functools
+import hashlib
+
+from flask import make_response, request
+from models import storage
+
+
+MAX_PAGES = 256
+pages = {}
+
+
+def cached(view):
+    """
+    Decorate a view function so that its rendered page is cached.
+
+    Args:
+        view (function): The view function, returning an HTML string.
+
+    Returns:
+        function: The caching view function.
+    """
+    @functools.wraps(view)
+    def cached_view(*args, **kwargs):
+        """Serve the cached page, rendering it first if it is stale."""
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        generation = storage.generation()
+        page = pages.get(key)
+        if page is None or page[0] != generation:
+            body = view(*args, **kwargs)
+            etag = hashlib.sha1(body.encode()).hexdigest()
+            if key not in pages and len(pages) >= MAX_PAGES:
+                pages.pop(next(iter(pages)), None)
+            page = (generation, body, etag)
+            pages[key] = page
+        response = make_response(page[1])
+        response.set_etag(page[2])
+        return response.make_conditional(request)
+    return cached_view